@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pages import check
+from pages.backends import Backend, MemoryBackend
+
+import write
+
+parser = argparse.ArgumentParser(description='Editor and Export Benchmarks')
+parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help='documents per collection')
+parser.add_argument('--latency', type=float, default=2.0, help='injected latency per request (ms)')
+parser.add_argument('--scenarios', type=str, nargs='+', help='only run these scenarios')
+parser.add_argument('--json', type=str, help='write results to this path')
+parser.add_argument('--compare', type=str, help='baseline results; exit 1 on regression')
+parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown / memory growth')
+
+# Firestore round trips per backend call (a transaction is begin + batch get + commit)
+RPC_COST = {
+    'server_timestamp': 0,
+    'save': 3,
+}
+
+class LatencyBackend(Backend): # wraps a backend, counting calls and sleeping once per round trip
+
+    def __init__(self, inner, latency):
+        self.inner = inner
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _rpc(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        cost = RPC_COST.get(name, 1)
+        if cost and self.latency:
+            time.sleep(self.latency * cost)
+
+    def rpcs(self):
+        return sum(RPC_COST.get(name, 1) * count for name, count in self.calls.items())
+
+    def collections(self):
+        self._rpc('collections')
+        return self.inner.collections()
+
+    def stream(self, collection, filters=(), fields=None, start_after=None, limit=None):
+        self._rpc('stream')
+        return self.inner.stream(collection, filters, fields, start_after, limit)
+
+    def get(self, collection, doc_id, fields=None):
+        self._rpc('get')
+        return self.inner.get(collection, doc_id, fields)
+
+    def get_all(self, keys, fields=None):
+        self._rpc('get_all')
+        return self.inner.get_all(keys, fields)
+
+    def set(self, collection, doc_id, data, merge=False):
+        self._rpc('set')
+        return self.inner.set(collection, doc_id, data, merge)
+
+    def add(self, collection, data):
+        self._rpc('add')
+        return self.inner.add(collection, data)
+
+    def delete(self, collection, doc_id):
+        self._rpc('delete')
+        return self.inner.delete(collection, doc_id)
+
+    def save(self, writes, on_create):
+        self._rpc('save')
+        return self.inner.save(writes, on_create)
+
+    def bulk(self, writes, create_only=False, on_result=None, max_attempts=5, ops_per_second=500):
+        self._rpc('bulk')
+        return self.inner.bulk(writes, create_only, on_result, max_attempts, ops_per_second)
+
+    def watch(self, collection, filters, on_change, end_at=None):
+        self._rpc('watch')
+        return self.inner.watch(collection, filters, on_change, end_at)
+
+    def server_timestamp(self):
+        return self.inner.server_timestamp()
+
+# USACOProblemsPage layout: fields fanned out to 'usaco' and the base collection
+FIELD_COLLECTION = {
+    'usaco': ['link', 'division', 'title'],
+    None: ['title', 'language', 'submission'],
+}
+
+SUBMISSION = "def solve():\n    return sum(range(100))\n" * 10
+
+def dataset(size): # 'problems' with half the documents tagged 'usaco', mirrored in 'usaco'
+    problems, usaco = {}, {}
+    for i in range(size):
+        doc_id = f"doc{i:06d}"
+        problems[doc_id] = {'title': f"Problem {i}", 'language': 'python', 'submission': SUBMISSION}
+        if i % 2 == 0:
+            problems[doc_id]['tag'] = 'usaco'
+            usaco[doc_id] = {'title': f"Problem {i}", 'link': f"https://usaco.org/{i}", 'division': 'Gold'}
+    return {'problems': problems, 'usaco': usaco}
+
+def fanout_writes(i):
+    return {
+        'usaco': {'link': f"https://usaco.org/{i}", 'division': 'Silver', 'title': f"Edited {i}"},
+        None: {'title': f"Edited {i}", 'language': 'cpp', 'submission': SUBMISSION, 'tag': 'usaco'},
+    }
+
+# scenarios, each maps to the data-layer work behind one editor or export action
+
+def save_existing(size):
+    check.save_fanout('problems', 'doc000000', fanout_writes(0))
+
+def save_new(size):
+    check.save_fanout('problems', '', fanout_writes(size))
+
+def load_document(size):
+    check.load_fanout('problems', 'doc000000', FIELD_COLLECTION)
+
+def gen_id(size):
+    check.generate_document_id('problems', FIELD_COLLECTION)
+
+ID_PAGE_SIZE = 200 # DocumentListModel.PAGE_SIZE (not imported, Qt-free)
+
+def set_documents(size): # first ID page for the dropdown plus the listener over the listed range
+    docs, cursor = check.list_documents_page('problems', 'usaco', page_size=ID_PAGE_SIZE)
+    ready = threading.Event()
+    watch = check.watch_document_ids('problems', 'usaco', lambda added, removed: ready.set(), end_at=cursor)
+    ready.wait(10)
+    watch.unsubscribe()
+
+def list_document_ids(size):
+    check.list_document_ids('problems', 'usaco')
+
+def write_documents(size):
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            write.write_documents('problems', os.path.join(directory, 'problems.json'))
+
+SCENARIOS = {
+    'editor.save_document': save_existing,
+    'editor.save_document.new': save_new,
+    'editor.load_document': load_document,
+    'editor.gen_id': gen_id,
+    'editor.set_documents': set_documents,
+    'check.list_document_ids': list_document_ids,
+    'write.write_documents': write_documents,
+}
+
+def prepare(size, latency):
+    backend = LatencyBackend(MemoryBackend(dataset(size)), latency)
+    check.set_backend(backend)
+    check.refresh_collections() # warm collection cache, as in a running editor
+    backend.calls.clear()
+    return backend
+
+def measure(name, size, latency):
+    scenario = SCENARIOS[name]
+
+    # round trips and wall time
+    backend = prepare(size, latency)
+    start = time.perf_counter()
+    scenario(size)
+    seconds = time.perf_counter() - start
+    calls = dict(backend.calls)
+    rpcs = backend.rpcs()
+
+    # peak memory (separate run, tracing slows everything down)
+    prepare(size, 0)
+    tracemalloc.start()
+    scenario(size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "size": size,
+        "rpcs": rpcs,
+        "calls": calls,
+        "seconds": round(seconds, 5),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def compare(results, baseline, tolerance): # regressions as readable strings
+    previous = {(entry["scenario"], entry["size"]): entry for entry in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scenario"], result["size"]))
+        if old is None:
+            continue
+        label = f"{result['scenario']} @ {result['size']}"
+        if result["rpcs"] > old["rpcs"]: # round trips are deterministic
+            regressions.append(f"{label}: {old['rpcs']} -> {result['rpcs']} round trips")
+        if result["seconds"] > old["seconds"] * (1 + tolerance) + 0.001:
+            regressions.append(f"{label}: {old['seconds']}s -> {result['seconds']}s")
+        if result["peak_kb"] > old["peak_kb"] * (1 + tolerance) + 16:
+            regressions.append(f"{label}: {old['peak_kb']} KB -> {result['peak_kb']} KB peak")
+    return regressions
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    write.args = write.parser.parse_args([])
+
+    names = args.scenarios or list(SCENARIOS)
+    results = []
+    for name in names:
+        for size in args.sizes:
+            result = measure(name, size, args.latency / 1000)
+            results.append(result)
+            print(f"{name:<28} {size:>7} docs  {result['rpcs']:>5} rpcs  {result['seconds'] * 1000:>9.1f} ms  {result['peak_kb']:>10.1f} KB")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
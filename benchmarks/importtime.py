@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description='Import Time Benchmark')
+parser.add_argument('--modules', type=str, nargs='+', default=['pages.check', 'write'], help='modules to import')
+parser.add_argument('--runs', type=int, default=5, help='runs per module (best is reported)')
+parser.add_argument('--top', type=int, default=10, help='slowest imports listed per module')
+parser.add_argument('--json', type=str, help='write results to this path')
+
+# modules whose presence means the CLI paid for something it does not use
+HEAVY = ['PyQt5', 'PyQt5.QtWebEngineWidgets', 'grpc', 'google.cloud.firestore']
+
+def measure(module): # one cold interpreter, parsed -X importtime output
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    error = proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+    return imports, error
+
+def run(module, runs, top):
+    best = None
+    for _ in range(runs):
+        imports, error = measure(module)
+        if error:
+            return {"module": module, "error": error}
+        total = sum(self_us for self_us, _ in imports.values())
+        if best is None or total < best[0]:
+            best = (total, imports)
+    total, imports = best
+    slowest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 2),
+        "modules_imported": len(imports),
+        "heavy": [name for name in HEAVY if name in imports],
+        "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000, 2)} for name, (_, cumulative) in slowest],
+    }
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    results = [run(module, args.runs, args.top) for module in args.modules]
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']}: failed ({result['error']})")
+            continue
+        print(f"{result['module']}: {result['total_ms']} ms, {result['modules_imported']} modules, heavy: {', '.join(result['heavy']) or 'none'}")
+        for entry in result["slowest"]:
+            print(f"    {entry['cumulative_ms']:>8} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
@@ -1,7 +1,12 @@
 import sys
+import time
+
+START = time.perf_counter() # startup timing reference
+
 from pages.posts import PostsPage
 from pages.problems import ProblemsPage, USACOProblemsPage
 from PyQt5 import QtWidgets, QtCore
+from pages.worker import Worker
 
 from datetime import datetime
 
@@ -62,12 +67,6 @@ class HomePage(QtWidgets.QWidget):
         self.collection_box = QtWidgets.QVBoxLayout()
         collection_menu.addLayout(self.collection_box)
 
-        # collection buttons
-        for collection in get_collections():
-            btn = QtWidgets.QPushButton(collection.id)
-            btn.clicked.connect(lambda _, c=collection.id: self.refresh_page({"id": c}))
-            self.collection_box.addWidget(btn)
-        
         # new collection button
         new_collection_btn = QtWidgets.QPushButton("+ New")
         new_collection_btn.clicked.connect(lambda _: self.refresh_page({"id": None}))
@@ -76,6 +75,12 @@ class HomePage(QtWidgets.QWidget):
         # expand space
         self.collection_box.addStretch()
 
+        # collection buttons (filled in once listed)
+        self.pool = QtCore.QThreadPool.globalInstance()
+        self._collections_worker = Worker(get_collections)
+        self._collections_worker.signals.finished.connect(self.add_collection_buttons)
+        self._collections_worker.signals.failed.connect(lambda e: print(f"WARNING: Could Not List Collections ({e})"))
+
         # type menu initialization
         type_menu = QtWidgets.QVBoxLayout()
         type_menu.setAlignment(QtCore.Qt.AlignTop)
@@ -94,31 +99,56 @@ class HomePage(QtWidgets.QWidget):
         self.stack = QtWidgets.QStackedWidget()
         layout.addWidget(self.stack)
 
-        # pages initialization
+        # pages initialization (constructed on first navigation)
         self.pages = {}
+        self.factories = {}
         self.routes = []
     
-        # add pages
+        # add page types
         for type in types:
 
-            page = type()
+            title = getattr(type, "TITLE", type.__name__)
 
             # type button
-            btn = QtWidgets.QPushButton(page.title)
-            btn.clicked.connect(lambda _, p=page.title: self.navigate(p))
+            btn = QtWidgets.QPushButton(title)
+            btn.clicked.connect(lambda _, p=title: self.navigate(p))
             type_box.addWidget(btn)
 
-            # type page
-            self.pages[page.title] = page
+            # type page factory
+            self.factories[title] = type
+            self.routes.append({ "label": title, "route": title })
+
+    # start network work and build the initial page once the window has painted
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not hasattr(self, "_started"):
+            self._started = True
+            QtCore.QTimer.singleShot(0, self.on_first_paint)
+
+    def on_first_paint(self):
+        print(f"First paint after {(time.perf_counter() - START) * 1000:.0f} ms")
+        self._collections_worker.submit(self.pool)
+        self.navigate(self.routes[0]["route"]) # set initial page
+        print(f"Initial page after {(time.perf_counter() - START) * 1000:.0f} ms")
+
+    def add_collection_buttons(self, collection_ids):
+        for collection_id in collection_ids:
+            btn = QtWidgets.QPushButton(collection_id)
+            btn.clicked.connect(lambda _, c=collection_id: self.refresh_page({"id": c}))
+            self.collection_box.insertWidget(self.collection_box.count() - 2, btn) # add before new collection button
+        print(f"Collections listed after {(time.perf_counter() - START) * 1000:.0f} ms")
+
+    # build a page the first time it is needed
+    def page(self, route):
+        if route not in self.pages and route in self.factories:
+            page = self.factories[route]()
+            self.pages[route] = page
             self.stack.addWidget(page)
-            self.routes.append({ "label": page.title, "route": page.title })
 
             # when new collection created
             page.collectionCreated.connect(self.add_collection)
+        return self.pages.get(route)
 
-        # set initial page  
-        self.stack.setCurrentWidget(self.pages[self.routes[0]["route"]])
-    
     def add_collection(self, msg):
 
         # type button
@@ -133,15 +163,19 @@ class HomePage(QtWidgets.QWidget):
 
     def refresh_page(self, msg): # response to collection changed
         widget = self.stack.currentWidget()
+        if widget is None: # no page built yet
+            return
         widget.set_collection(msg)
 
     def navigate(self, route):
-        page = self.pages.get(route)
-        collection = self.stack.currentWidget().collection
-        doc = self.stack.currentWidget().doc_id_input.currentText().strip()
+        current = self.stack.currentWidget()
+        page = self.page(route)
         if page:
             self.stack.setCurrentWidget(page)
-            self.refresh_page({ "id": collection, "doc_id": doc })
+            if current is not None: # carry collection and document over
+                collection = current.collection
+                doc = current.doc_id_input.currentText().strip()
+                self.refresh_page({ "id": collection, "doc_id": doc })
 
 theme = 'dark' # TODO: implement theme switching
 
@@ -0,0 +1,13 @@
+# the data layer (pages.check, pages.mirror) imports without Qt; editor pages load Qt on first access
+_PAGES = {
+    'CollectionEditorPage': 'pages.page',
+    'PostsPage': 'pages.posts',
+    'ProblemsPage': 'pages.problems',
+    'USACOProblemsPage': 'pages.problems',
+}
+
+def __getattr__(name):
+    if name in _PAGES:
+        import importlib
+        return getattr(importlib.import_module(_PAGES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
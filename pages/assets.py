@@ -0,0 +1,85 @@
+import os
+import mimetypes
+from PyQt5 import QtCore
+from PyQt5.QtWebEngineCore import QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+
+# vendored web assets (fetch with vendor.py), served from a local scheme
+from pages.sources import VENDOR_DIR, SHIKI_VERSION, KATEX_CDN, ESM_CDN
+
+SCHEME = b'asset'
+ASSET_BASE = 'asset://local/' # base URL of every preview page
+
+MIME_TYPES = {
+    '.mjs': 'text/javascript',
+    '.js': 'text/javascript',
+    '.css': 'text/css',
+    '.wasm': 'application/wasm',
+    '.woff2': 'font/woff2',
+    '.woff': 'font/woff',
+    '.ttf': 'font/ttf',
+}
+
+def vendor_path(path): # local file for an asset URL path (esm.sh entry points are stored as index.mjs)
+    local = os.path.normpath(os.path.join(VENDOR_DIR, path.lstrip('/')))
+    if not local.startswith(VENDOR_DIR + os.sep): # outside vendor directory
+        return None
+    if os.path.isdir(local):
+        local = os.path.join(local, 'index.mjs')
+    return local
+
+def vendored(path):
+    local = vendor_path(path)
+    return local is not None and os.path.isfile(local)
+
+def katex_url(name): # e.g. 'katex.min.js'
+    path = f'katex/{name}'
+    return ASSET_BASE + path if vendored(path) else KATEX_CDN + name
+
+def shiki_url():
+    path = f'shiki@{SHIKI_VERSION}'
+    return ASSET_BASE + path if vendored(path) else ESM_CDN + path
+
+# must run before the QApplication is created (done at import)
+def register_scheme():
+    scheme = QWebEngineUrlScheme(SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(
+        QWebEngineUrlScheme.SecureScheme |
+        QWebEngineUrlScheme.LocalScheme |
+        QWebEngineUrlScheme.LocalAccessAllowed |
+        QWebEngineUrlScheme.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+register_scheme()
+
+class AssetSchemeHandler(QWebEngineUrlSchemeHandler):
+
+    def requestStarted(self, job):
+        local = vendor_path(job.requestUrl().path())
+        if local is None or not os.path.isfile(local):
+            job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+            return
+
+        with open(local, 'rb') as file:
+            data = file.read()
+
+        ext = os.path.splitext(local)[1]
+        mime = MIME_TYPES.get(ext) or mimetypes.guess_type(local)[0] or 'application/octet-stream'
+
+        # buffer lives as long as the job
+        buffer = QtCore.QBuffer(job)
+        buffer.setData(data)
+        job.reply(mime.encode(), buffer)
+
+_profile = None
+
+def shared_profile(): # one persistent profile (disk cache, asset scheme) for every preview
+    global _profile
+    if _profile is None:
+        _profile = QWebEngineProfile('preview', QtCore.QCoreApplication.instance())
+        _profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+        _profile.setPersistentCookiesPolicy(QWebEngineProfile.AllowPersistentCookies)
+        _profile.installUrlSchemeHandler(SCHEME, AssetSchemeHandler(_profile))
+    return _profile
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+from pages.check import save_fanout
+
+# autosave: edits are appended to a local journal right away and written to Firestore at most once per document per interval
+AUTOSAVE_INTERVAL = 10 # seconds between writes of the same document
+FLUSH_TIMEOUT = 10 # seconds to wait for queued writes on exit (the journal replays the rest)
+
+def _encode(writes): # JSON keys cannot be None (base collection)
+    return {collection or "": data for collection, data in writes.items()}
+
+def _decode(writes):
+    return {collection or None: data for collection, data in writes.items()}
+
+def _merge(older, newer): # per collection, newer field values win
+    merged = {collection: dict(data) for collection, data in older.items()}
+    for collection, data in newer.items():
+        merged.setdefault(collection, {}).update(data)
+    return merged
+
+class Journal: # append-only JSON lines, an edit {"seq", "collection", "doc_id", "writes"} or a marker {"synced": seq, ...}
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._synced = {} # (collection, doc_id) -> highest synced seq
+        self._latest = {} # (collection, doc_id) -> highest journaled seq
+        for record in self._records():
+            key = (record["collection"], record["doc_id"])
+            if "synced" in record:
+                self._synced[key] = max(self._synced.get(key, 0), record["synced"])
+            else:
+                self._latest[key] = record["seq"]
+                self._seq = max(self._seq, record["seq"])
+        self._file = open(path, "a")
+
+    def _records(self):
+        try:
+            with open(self.path) as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError: # torn last line from a crash
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _write(self, record): # caller holds the lock
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush() # survives a crash of the app (fsync() for power loss)
+
+    def append(self, collection, doc_id, writes): # returns the edit's seq
+        with self._lock:
+            self._seq += 1
+            self._latest[(collection, doc_id)] = self._seq
+            self._write({"seq": self._seq, "collection": collection, "doc_id": doc_id, "writes": _encode(writes)})
+            return self._seq
+
+    def latest(self, collection, doc_id): # seq of the last edit of a document (0 if none)
+        with self._lock:
+            return self._latest.get((collection, doc_id), 0)
+
+    def mark_synced(self, collection, doc_id, seq): # every edit of the document up to seq is in Firestore
+        with self._lock:
+            key = (collection, doc_id)
+            if seq <= self._synced.get(key, 0):
+                return
+            self._synced[key] = seq
+            if all(self._synced.get(key, 0) >= latest for key, latest in self._latest.items()): # nothing left to replay
+                self._file.truncate(0)
+                self._latest.clear()
+                self._synced.clear()
+            else:
+                self._write({"synced": seq, "collection": collection, "doc_id": doc_id})
+
+    def fsync(self):
+        with self._lock:
+            os.fsync(self._file.fileno())
+
+    def pending(self): # [(collection, doc_id, writes, seq)] edits not yet synced, merged per document
+        with self._lock:
+            self._file.flush()
+            edits = {}
+            for record in self._records():
+                if "synced" in record:
+                    continue
+                key = (record["collection"], record["doc_id"])
+                if record["seq"] <= self._synced.get(key, 0):
+                    continue
+                writes, _ = edits.get(key, ({}, 0))
+                edits[key] = (_merge(writes, _decode(record["writes"])), record["seq"])
+            return [(collection, doc_id, writes, seq) for (collection, doc_id), (writes, seq) in edits.items()]
+
+    def compact(self): # rewrite with unsynced edits only
+        pending = self.pending()
+        with self._lock:
+            temp = f"{self.path}.tmp"
+            with open(temp, "w") as file:
+                for collection, doc_id, writes, seq in pending:
+                    file.write(json.dumps({"seq": seq, "collection": collection, "doc_id": doc_id, "writes": _encode(writes)}) + "\n")
+            self._file.close()
+            os.replace(temp, self.path)
+            self._file = open(self.path, "a")
+            self._synced.clear()
+            self._latest = {(collection, doc_id): seq for collection, doc_id, _, seq in pending}
+
+class AutoSaver: # coalesces journaled edits into at most one write per document per interval, on a background thread
+
+    def __init__(self, journal, interval=AUTOSAVE_INTERVAL, save=save_fanout):
+        self.journal = journal
+        self.interval = interval
+        self.save = save
+        self.listeners = [] # fn(collection, doc_id, writes, error) after each write (error None on success), on the autosave thread
+        self._cond = threading.Condition()
+        self._queue = {} # (collection, doc_id) -> [writes, seq, due, failed]
+        self._generations = {} # (collection, doc_id) -> discard() count, writes taken before a discard are stale
+        self._busy = False
+        self._flushing = False
+
+        # edits a previous run never wrote go first
+        now = time.monotonic()
+        for collection, doc_id, writes, seq in journal.pending():
+            self._queue[(collection, doc_id)] = [writes, seq, now, False]
+        journal.compact()
+
+        threading.Thread(target=self._run, name="autosave", daemon=True).start()
+
+    def edit(self, collection, doc_id, writes): # journal now, write later
+        seq = self.journal.append(collection, doc_id, writes)
+        with self._cond:
+            self._enqueue((collection, doc_id), writes, seq)
+            self._cond.notify()
+
+    def _enqueue(self, key, writes, seq, due=None, failed=False): # caller holds the condition
+        queued = self._queue.get(key)
+        if queued is None:
+            self._queue[key] = [writes, seq, due if due is not None else time.monotonic() + self.interval, failed]
+        else: # coalesce, keeping the earlier due time
+            queued[0] = _merge(queued[0], writes)
+            queued[1] = max(queued[1], seq)
+
+    def discard(self, collection, doc_id): # drop queued edits (a manual save covers them), returns the seq to mark synced once it succeeds
+        with self._cond:
+            self._queue.pop((collection, doc_id), None)
+            self._generations[(collection, doc_id)] = self._generations.get((collection, doc_id), 0) + 1
+        return self.journal.latest(collection, doc_id)
+
+    def synced(self, collection, doc_id, seq):
+        self.journal.mark_synced(collection, doc_id, seq)
+
+    def flush(self, timeout=FLUSH_TIMEOUT): # write everything queued now, True if nothing is left
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify()
+            while (self._flushable() or self._busy) and time.monotonic() < deadline: # failed writes wait for their retry
+                self._cond.wait(deadline - time.monotonic())
+            self._flushing = False
+            return not self._queue and not self._busy
+
+    def _flushable(self): # caller holds the condition
+        return any(not failed for _, _, _, failed in self._queue.values())
+
+    def _next(self): # (key, writes, seq, generation) of the next due document, waits until there is one
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._queue:
+                    key = min(self._queue, key=lambda key: (self._flushing and self._queue[key][3], self._queue[key][2]))
+                    due, failed = self._queue[key][2:]
+                    if (self._flushing and not failed) or due <= now:
+                        writes, seq, _, _ = self._queue.pop(key)
+                        self._busy = True
+                        return key, writes, seq, self._generations.get(key, 0)
+                    self._cond.wait(due - now)
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            key, writes, seq, generation = self._next()
+            collection, doc_id = key
+            error = None
+            try:
+                self.journal.fsync()
+                self.save(collection, doc_id, writes)
+                self.journal.mark_synced(collection, doc_id, seq)
+            except Exception as e:
+                error = e
+            with self._cond:
+                stale = self._generations.get(key, 0) != generation # a manual save covers these edits
+                if error is not None and not stale: # retried next interval, under any newer edits
+                    queued = self._queue.pop(key, None)
+                    self._enqueue(key, writes, seq, time.monotonic() + self.interval, failed=True)
+                    if queued is not None:
+                        self._enqueue(key, queued[0], queued[1])
+                self._busy = False
+                self._cond.notify_all()
+            if stale: # its values must not become the page's baseline either
+                continue
+            for listener in list(self.listeners):
+                try:
+                    listener(collection, doc_id, writes, error)
+                except Exception: # e.g. a closed page, the writer keeps going
+                    pass
+
+autosaver = None
+
+def enable_autosave(path, interval=None): # journal edits to path and write them in the background
+    global autosaver
+    if autosaver is None:
+        autosaver = AutoSaver(Journal(path), AUTOSAVE_INTERVAL if interval is None else interval)
+        atexit.register(lambda: autosaver.flush() if autosaver is not None else None)
+    elif interval is not None:
+        autosaver.interval = interval
+    return autosaver
+
+def disable_autosave():
+    global autosaver
+    if autosaver is not None:
+        autosaver.flush()
+    autosaver = None
+
+if os.environ.get('FIRESTORE_AUTOSAVE'):
+    enable_autosave(os.environ['FIRESTORE_AUTOSAVE'])
@@ -0,0 +1,402 @@
+import os
+import copy
+import uuid
+import bisect
+import threading
+from datetime import datetime, timezone
+
+# storage backends behind pages.check
+# documents are plain dicts, queries are lists of (field, op, value) filters and results are ordered by document ID
+
+class Backend:
+
+    def collections(self): # root collection IDs
+        raise NotImplementedError
+
+    def stream(self, collection, filters=(), fields=None, start_after=None, limit=None): # (id, data) pairs, fields=() projects IDs only, None = all
+        raise NotImplementedError
+
+    def get(self, collection, doc_id, fields=None): # data or None
+        raise NotImplementedError
+
+    def get_all(self, keys, fields=None): # [(collection, doc_id)] -> [data or None] in one request
+        raise NotImplementedError
+
+    def set(self, collection, doc_id, data, merge=False):
+        raise NotImplementedError
+
+    def add(self, collection, data): # new document with generated ID, returns the ID
+        raise NotImplementedError
+
+    def delete(self, collection, doc_id):
+        raise NotImplementedError
+
+    def save(self, writes, on_create): # atomically write [(collection, doc_id, data)], updating only the given fields of existing documents and adding on_create fields to new ones, returns created flags
+        raise NotImplementedError
+
+    def bulk(self, writes, create_only=False, on_result=None, max_attempts=5, ops_per_second=500): # stream [(collection, doc_id, data)] as whole documents, batched and retried, returns outcome counts
+        # outcomes are 'written', 'exists' (create_only and already present) or 'failed', on_result(collection, doc_id, data, outcome) per write
+        raise NotImplementedError
+
+    def watch(self, collection, filters, on_change, end_at=None): # on_change(added_ids, removed_ids), returns an object with unsubscribe()
+        # end_at limits the listener to document IDs up to and including it
+        raise NotImplementedError
+
+    def server_timestamp(self): # sentinel replaced by the commit time
+        raise NotImplementedError
+
+# Firestore
+
+SERVICE_ACCOUNT = 'service_account.json'
+ALREADY_EXISTS = 6 # gRPC status of create() on an existing document
+BULK_BATCH = 20 # writes per BulkWriter batch
+PERMANENT_ERRORS = {3, 5, 6, 7, 9} # INVALID_ARGUMENT, NOT_FOUND, ALREADY_EXISTS, PERMISSION_DENIED, FAILED_PRECONDITION (never retried)
+EMULATOR_PROJECT = 'demo-blog' # project ID used with FIRESTORE_EMULATOR_HOST
+
+_client = None
+_client_lock = threading.Lock()
+
+def _firestore(): # google.cloud.firestore module, imported on first use
+    from google.cloud import firestore
+    return firestore
+
+def get_client(): # process-wide client, created on first use
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if os.environ.get('FIRESTORE_EMULATOR_HOST'): # local emulator, no credentials
+                    _client = _firestore().Client(project=os.environ.get('FIRESTORE_PROJECT', EMULATOR_PROJECT))
+                else:
+                    from google.oauth2 import service_account
+                    creds = service_account.Credentials.from_service_account_file(
+                        SERVICE_ACCOUNT
+                    )
+                    _client = _firestore().Client(credentials=creds)
+    return _client
+
+class FirestoreBackend(Backend):
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def _ref(self, collection, doc_id):
+        return self.client.collection(collection).document(doc_id)
+
+    def _query(self, collection, filters, fields, start_after, limit):
+        firestore = _firestore()
+        query = self.client.collection(collection)
+        for field, op, value in filters: # filtered on the server
+            query = query.where(filter=firestore.FieldFilter(field, op, value))
+        if fields is not None:
+            query = query.select(list(fields) or [firestore.FieldPath.document_id()]) # project IDs only
+        if start_after is not None or limit is not None: # paginate on document ID
+            query = query.order_by(firestore.FieldPath.document_id())
+        if start_after is not None:
+            query = query.start_after({firestore.FieldPath.document_id(): self._ref(collection, start_after)})
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def collections(self):
+        return [collection.id for collection in self.client.collections()]
+
+    def stream(self, collection, filters=(), fields=None, start_after=None, limit=None):
+        for doc in self._query(collection, filters, fields, start_after, limit).stream():
+            yield doc.id, doc.to_dict() or {}
+
+    def get(self, collection, doc_id, fields=None):
+        snapshot = self._ref(collection, doc_id).get(field_paths=fields)
+        return (snapshot.to_dict() or {}) if snapshot.exists else None
+
+    def get_all(self, keys, fields=None):
+        refs = [self._ref(collection, doc_id) for collection, doc_id in keys]
+        snapshots = {snapshot.reference.path: snapshot for snapshot in self.client.get_all(refs, field_paths=None if fields is None else list(fields))}
+        return [(snapshots[ref.path].to_dict() or {}) if snapshots[ref.path].exists else None for ref in refs]
+
+    def set(self, collection, doc_id, data, merge=False):
+        self._ref(collection, doc_id).set(data, merge=merge)
+
+    def add(self, collection, data):
+        return self.client.collection(collection).add(data)[1].id
+
+    def delete(self, collection, doc_id):
+        self._ref(collection, doc_id).delete()
+
+    def save(self, writes, on_create):
+        refs = [self._ref(collection, doc_id) for collection, doc_id, _ in writes]
+
+        @_firestore().transactional
+        def commit(transaction):
+            # resolve create vs update inside the transaction (one read for every document)
+            snapshots = {snapshot.reference.path: snapshot for snapshot in self.client.get_all(refs, field_paths=list(on_create) or None, transaction=transaction)}
+            created = []
+            for ref, (_, _, data) in zip(refs, writes):
+                exists = snapshots[ref.path].exists
+                if exists: # only the given field paths are sent
+                    transaction.update(ref, {_firestore().FieldPath(field).to_api_repr(): value for field, value in data.items()})
+                else:
+                    transaction.set(ref, {**data, **on_create}, merge=True)
+                created.append(not exists)
+            return created
+
+        return commit(self.client.transaction())
+
+    def bulk(self, writes, create_only=False, on_result=None, max_attempts=5, ops_per_second=500):
+        from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions, BulkRetry
+
+        # batches are committed on the writer's executor, rate limited to ops_per_second
+        writer = self.client.bulk_writer(BulkWriterOptions(
+            initial_ops_per_second=min(500, ops_per_second), max_ops_per_second=ops_per_second, retry=BulkRetry.exponential,
+        ))
+
+        counts = {'written': 0, 'exists': 0, 'failed': 0}
+        pending = {} # document path -> queued writes (a file may repeat an ID), bounded so a large file is never queued whole
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(max(2 * BULK_BATCH, ops_per_second))
+
+        def finish(path, outcome):
+            with lock:
+                counts[outcome] += 1
+                queued = pending[path]
+                collection, doc_id, data = queued.pop(0)
+                if not queued:
+                    del pending[path]
+            slots.release()
+            if on_result:
+                on_result(collection, doc_id, data, outcome)
+
+        def on_success(reference, result, bulk_writer):
+            finish(reference.path, 'written')
+
+        def on_error(error, bulk_writer): # True retries the write (with backoff)
+            if error.code not in PERMANENT_ERRORS and error.attempts < max_attempts:
+                return True
+            finish(error.operation.reference.path, 'exists' if create_only and error.code == ALREADY_EXISTS else 'failed')
+            return False
+
+        writer.on_write_result(on_success)
+        writer.on_write_error(on_error)
+
+        try:
+            for collection, doc_id, data in writes:
+                ref = self._ref(collection, doc_id)
+                while not slots.acquire(timeout=1): # retries are only rescheduled while sending, so flush when stuck
+                    writer.flush()
+                with lock:
+                    pending.setdefault(ref.path, []).append((collection, doc_id, data))
+                if create_only:
+                    writer.create(ref, data)
+                else:
+                    writer.set(ref, data)
+        finally:
+            writer.close() # flush and wait for every outstanding write
+
+        return counts
+
+    def watch(self, collection, filters, on_change, end_at=None):
+
+        def callback(snapshots, changes, read_time):
+            added = [change.document.id for change in changes if change.type.name == 'ADDED']
+            removed = [change.document.id for change in changes if change.type.name == 'REMOVED']
+            on_change(added, removed)
+
+        query = self._query(collection, filters, None, None, None)
+        if end_at is not None: # ordered on document ID, which needs no composite index
+            firestore = _firestore()
+            query = query.order_by(firestore.FieldPath.document_id()).end_at({firestore.FieldPath.document_id(): self._ref(collection, end_at)})
+        return query.on_snapshot(callback)
+
+    def server_timestamp(self):
+        return _firestore().SERVER_TIMESTAMP
+
+# in memory (thread safe, no network)
+
+class _ServerTimestamp:
+
+    def __repr__(self):
+        return "SERVER_TIMESTAMP"
+
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+}
+
+class _Watch:
+
+    def __init__(self, backend, collection, filters, on_change, end_at=None):
+        self.backend = backend
+        self.collection = collection
+        self.filters = filters
+        self.on_change = on_change
+        self.end_at = end_at
+        self.ids = set()
+
+    def unsubscribe(self):
+        self.backend._unwatch(self)
+
+class MemoryBackend(Backend):
+
+    def __init__(self, data=None): # data = {collection: {doc_id: fields}}
+        self._lock = threading.RLock()
+        self._data = copy.deepcopy(data) if data else {}
+        self._sorted = {} # collection -> sorted document IDs (rebuilt after inserts/deletes)
+        self._watches = []
+
+    @staticmethod
+    def _matches(data, filters):
+        for field, op, value in filters:
+            if field not in data: # missing fields never match, as in Firestore
+                return False
+            try:
+                if not OPERATORS[op](data[field], value):
+                    return False
+            except TypeError: # values of different types never compare
+                return False
+        return True
+
+    @staticmethod
+    def _project(data, fields):
+        if fields is None:
+            return copy.deepcopy(data)
+        return {field: copy.deepcopy(data[field]) for field in fields if field in data}
+
+    @staticmethod
+    def _resolve(data): # commit-time values
+        now = datetime.now(timezone.utc)
+        return {key: now if value is SERVER_TIMESTAMP else copy.deepcopy(value) for key, value in data.items()}
+
+    def _ids(self, collection): # caller holds the lock
+        if collection not in self._sorted:
+            self._sorted[collection] = sorted(self._data.get(collection, {}))
+        return self._sorted[collection]
+
+    def _write(self, collection, doc_id, data, merge): # caller holds the lock
+        docs = self._data.setdefault(collection, {})
+        if doc_id not in docs:
+            self._sorted.pop(collection, None)
+        data = self._resolve(data)
+        if merge and doc_id in docs:
+            docs[doc_id].update(data)
+        else:
+            docs[doc_id] = data
+
+    def _notify(self, collections): # deliver listener deltas outside the lock
+        deltas = []
+        with self._lock:
+            for watch in self._watches:
+                if watch.collection not in collections:
+                    continue
+                docs = self._data.get(watch.collection, {})
+                ids = {doc_id for doc_id, data in docs.items() if (watch.end_at is None or doc_id <= watch.end_at) and self._matches(data, watch.filters)}
+                added, removed = sorted(ids - watch.ids), sorted(watch.ids - ids)
+                watch.ids = ids
+                if added or removed:
+                    deltas.append((watch.on_change, added, removed))
+        for on_change, added, removed in deltas:
+            on_change(added, removed)
+
+    def collections(self):
+        with self._lock:
+            return sorted(collection for collection, docs in self._data.items() if docs)
+
+    def stream(self, collection, filters=(), fields=None, start_after=None, limit=None):
+        with self._lock: # consistent snapshot
+            docs = self._data.get(collection, {})
+            ids = self._ids(collection)
+            start = bisect.bisect_right(ids, start_after) if start_after is not None else 0
+            results = []
+            for doc_id in ids[start:]:
+                if not self._matches(docs[doc_id], filters):
+                    continue
+                results.append((doc_id, self._project(docs[doc_id], fields)))
+                if limit is not None and len(results) >= limit:
+                    break
+        return iter(results)
+
+    def get(self, collection, doc_id, fields=None):
+        with self._lock:
+            data = self._data.get(collection, {}).get(doc_id)
+            return None if data is None else self._project(data, fields)
+
+    def get_all(self, keys, fields=None):
+        with self._lock:
+            return [self.get(collection, doc_id, fields) for collection, doc_id in keys]
+
+    def set(self, collection, doc_id, data, merge=False):
+        with self._lock:
+            self._write(collection, doc_id, data, merge)
+        self._notify({collection})
+
+    def add(self, collection, data):
+        doc_id = uuid.uuid4().hex[:20]
+        self.set(collection, doc_id, data)
+        return doc_id
+
+    def delete(self, collection, doc_id):
+        with self._lock:
+            self._data.get(collection, {}).pop(doc_id, None)
+            self._sorted.pop(collection, None)
+        self._notify({collection})
+
+    def save(self, writes, on_create):
+        created = []
+        with self._lock: # all or nothing
+            for collection, doc_id, data in writes:
+                exists = doc_id in self._data.get(collection, {})
+                self._write(collection, doc_id, data if exists else {**data, **on_create}, merge=True)
+                created.append(not exists)
+        self._notify({collection for collection, _, _ in writes})
+        return created
+
+    def bulk(self, writes, create_only=False, on_result=None, max_attempts=5, ops_per_second=500):
+        counts = {'written': 0, 'exists': 0, 'failed': 0}
+        touched = set()
+        for collection, doc_id, data in writes:
+            with self._lock:
+                if create_only and doc_id in self._data.get(collection, {}):
+                    outcome = 'exists'
+                else:
+                    self._write(collection, doc_id, data, merge=False)
+                    touched.add(collection)
+                    outcome = 'written'
+            counts[outcome] += 1
+            if on_result:
+                on_result(collection, doc_id, data, outcome)
+        self._notify(touched)
+        return counts
+
+    def watch(self, collection, filters, on_change, end_at=None):
+        watch = _Watch(self, collection, list(filters), on_change, end_at)
+        with self._lock:
+            self._watches.append(watch)
+        self._notify({collection}) # initial snapshot
+        if not watch.ids: # empty initial snapshot is still delivered
+            on_change([], [])
+        return watch
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def server_timestamp(self):
+        return SERVER_TIMESTAMP
+
+BACKENDS = {
+    'firestore': FirestoreBackend,
+    'memory': MemoryBackend,
+}
@@ -1,58 +1,333 @@
-from google.cloud import firestore
-from google.oauth2 import service_account
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
 
-creds = service_account.Credentials.from_service_account_file(
-    'service_account.json'
-)
+from pages.mirror import Mirror, stamp
+from pages.backends import BACKENDS, get_client
+from pages.metrics import instrumented
 
-db = firestore.Client(credentials=creds)
+# storage backend (STORAGE_BACKEND = firestore | memory), created on first use
+_backend = None
+_backend_lock = threading.Lock()
 
-def get_collections():
-    return db.collections()
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = BACKENDS[os.environ.get('STORAGE_BACKEND', 'firestore')]()
+    return _backend
+
+def set_backend(backend): # e.g. MemoryBackend() for tests and benchmarks
+    global _backend
+    _backend = backend
+    _cache_reset()
+
+def __getattr__(name): # 'db' kept as a lazy module attribute (Firestore client)
+    if name == 'db':
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# collection metadata cache
+COLLECTION_TTL = 60 # seconds before a cached collection listing goes stale
+
+_collection_lock = threading.Lock()
+_collection_ids = set()
+_collection_time = None # monotonic time of last listing, None if never listed
+
+def set_collection_ttl(seconds): # configure how long collection listings are trusted
+    global COLLECTION_TTL
+    COLLECTION_TTL = seconds
+
+def _cache_collections(collection_ids): # replace cached collection IDs with a fresh listing
+    global _collection_ids, _collection_time
+    with _collection_lock:
+        _collection_ids = set(collection_ids)
+        _collection_time = time.monotonic()
+
+def _cache_reset():
+    global _collection_ids, _collection_time
+    with _collection_lock:
+        _collection_ids = set()
+        _collection_time = None
+
+def _cache_stale():
+    with _collection_lock:
+        return _collection_time is None or time.monotonic() - _collection_time > COLLECTION_TTL
+
+def _cache_add(collection_name): # write-through on collection creation
+    if not collection_name:
+        return
+    with _collection_lock:
+        _collection_ids.add(collection_name)
+
+# optional local mirror (read-through, write-through)
+MIRROR_TTL = 30 # seconds a mirrored document is served without revalidation
+
+mirror = None
+
+def enable_mirror(path, ttl=None): # serve load_document(s) from a local SQLite file
+    global mirror, MIRROR_TTL
+    mirror = Mirror(path)
+    if ttl is not None:
+        MIRROR_TTL = ttl
+
+def disable_mirror():
+    global mirror
+    mirror = None
+
+def _mirror_fresh(checked):
+    return time.time() - checked < MIRROR_TTL
+
+def _mirror_write(collection_name, document_id, data, merge=False): # server sentinels are left for revalidation
+    if mirror is None:
+        return
+    data = {k: v for k, v in data.items() if v is not get_timestamp()}
+    mirror.put(collection_name, document_id, data, fresh=False, merge=merge)
+
+if os.environ.get('FIRESTORE_MIRROR'):
+    enable_mirror(os.environ['FIRESTORE_MIRROR'])
+
+@instrumented('refresh_collections')
+def refresh_collections(): # force a new listing of root collections
+    collection_ids = get_backend().collections()
+    _cache_collections(collection_ids)
+    return collection_ids
+
+def get_collections(): # root collection IDs
+    return refresh_collections()
 
 def check_collection(collection_name): # check if collection exists
-    collections = get_collections()
-    for collection in collections:
-        if collection.id == collection_name:
-            return True
-    return False
+    if not collection_name:
+        return False
+    if _cache_stale():
+        refresh_collections()
+    with _collection_lock:
+        return collection_name in _collection_ids
 
+@instrumented('load_documents')
 def load_documents(collection_name): # load all documents from collection
     if not check_collection(collection_name):
         return None
-    docs = db.collection(collection_name).stream()
-    return [{'id': doc.id, **doc.to_dict()} for doc in docs]
+    if mirror is not None:
+        return _load_documents_mirrored(collection_name)
+    return [{'id': doc_id, **data} for doc_id, data in get_backend().stream(collection_name)]
+
+def _load_documents_mirrored(collection_name): # revalidate mirror with changes since its latest 'updated'
+    synced = mirror.synced(collection_name)
+    if synced is not None and _mirror_fresh(synced[1]):
+        return mirror.all(collection_name)
+    if synced is None or synced[0] is None: # never synced, full read
+        mirror.sync(collection_name, [{'id': doc_id, **data} for doc_id, data in get_backend().stream(collection_name)])
+    else: # changed documents plus an ID-only pass for deletions
+        changed = load_documents_since(collection_name, datetime.fromisoformat(synced[0]))
+        ids = {doc['id'] for doc in iter_documents(collection_name)}
+        mirror.sync(collection_name, changed, ids)
+    return mirror.all(collection_name)
+
+LIST_PAGE_SIZE = 500 # documents per listing page
+
+def _tag_filters(tag): # filtered on the server
+    return [('tag', '==', tag)] if tag else []
+
+@instrumented('list_documents_page')
+def list_documents_page(collection_name, tag=None, fields=(), page_size=LIST_PAGE_SIZE, cursor=None): # one page of documents, only 'fields' downloaded (None = all)
+    # project IDs only by default, resume after last document ID of previous page
+    results = get_backend().stream(collection_name, _tag_filters(tag), fields, start_after=cursor, limit=page_size)
+    docs = [{'id': doc_id, **data} for doc_id, data in results]
+    next_cursor = docs[-1]['id'] if len(docs) == page_size else None # None when exhausted
+    return docs, next_cursor
+
+def iter_documents(collection_name, tag=None, fields=(), page_size=LIST_PAGE_SIZE): # lazily page through a collection
+    cursor = None
+    while True:
+        docs, cursor = list_documents_page(collection_name, tag, fields, page_size, cursor)
+        yield from docs
+        if cursor is None:
+            return
 
+def list_document_ids(collection_name, tag=None): # IDs of documents in collection (optionally with tag)
+    if not check_collection(collection_name):
+        return None
+    return [doc['id'] for doc in iter_documents(collection_name, tag)]
+
+def watch_document_ids(collection_name, tag=None, on_change=None, end_at=None): # live listener, on_change(added_ids, removed_ids) runs on a background thread
+    # end_at limits it to IDs up to the last one listed, so only documents already paged in are downloaded
+    return get_backend().watch(collection_name, _tag_filters(tag), on_change, end_at) # call unsubscribe() on the result to stop
+
+@instrumented('load_documents_since')
+def load_documents_since(collection_name, since): # documents whose 'updated' timestamp is later than since
+    return [{'id': doc_id, **data} for doc_id, data in get_backend().stream(collection_name, [('updated', '>', since)])]
+
+@instrumented('create_document')
 def create_document(collection_name, doc_id, data): # create new document in collection
     if not doc_id:
-        return db.collection(collection_name).add(data)[1].id
-    db.collection(collection_name).document(doc_id).set(data)
+        doc_id = get_backend().add(collection_name, data)
+    else:
+        get_backend().set(collection_name, doc_id, data)
+    _cache_add(collection_name) # writing a document creates its collection
+    _mirror_write(collection_name, doc_id, data)
     return doc_id
 
+@instrumented('load_document')
 def load_document(collection_name, document_id): # load document from collection
     if not check_collection(collection_name):
         return None
     if not document_id:
         return None
-    doc = db.collection(collection_name).document(document_id).get()
-    if not doc.exists:
+    backend = get_backend()
+    if mirror is not None:
+        cached = mirror.get(collection_name, document_id)
+        if cached is not None:
+            data, updated, checked = cached
+            if _mirror_fresh(checked):
+                return data
+            if updated is not None: # revalidate with the 'updated' field only
+                current = backend.get(collection_name, document_id, fields=['updated'])
+                if current is None:
+                    mirror.delete(collection_name, document_id)
+                    return None
+                if stamp(current.get('updated')) == updated:
+                    mirror.touch(collection_name, document_id)
+                    return data
+    doc = backend.get(collection_name, document_id)
+    if doc is None:
         return None
-    return doc.to_dict()
+    if mirror is not None:
+        mirror.put(collection_name, document_id, doc)
+    return doc
+
+@instrumented('load_documents_batch')
+def load_documents_batch(keys, fields=None): # [(collection_name, document_id)] -> [document or None], one request for every document
+    # fields=() only checks existence ({} for existing documents)
+    docs = [None] * len(keys)
+    fetch = [] # indices still to be read from the backend
+    stale = [] # (index, cached data, cached stamp) to revalidate
+    for i, (collection_name, document_id) in enumerate(keys):
+        if not document_id or not check_collection(collection_name):
+            continue
+        if mirror is not None and fields is None:
+            cached = mirror.get(collection_name, document_id)
+            if cached is not None:
+                data, updated, checked = cached
+                if _mirror_fresh(checked):
+                    docs[i] = data
+                    continue
+                if updated is not None:
+                    stale.append((i, data, updated))
+                    continue
+        fetch.append(i)
+    backend = get_backend()
+    if stale: # revalidate with the 'updated' field only, one request for all of them
+        results = backend.get_all([keys[i] for i, _, _ in stale], ['updated'])
+        for (i, data, updated), current in zip(stale, results):
+            if current is None:
+                mirror.delete(*keys[i])
+            elif stamp(current.get('updated')) == updated:
+                mirror.touch(*keys[i])
+                docs[i] = data
+            else:
+                fetch.append(i)
+    if fetch:
+        results = backend.get_all([keys[i] for i in fetch], fields)
+        for i, doc in zip(fetch, results):
+            docs[i] = doc
+            if mirror is not None and fields is None and doc is not None:
+                mirror.put(*keys[i], doc)
+    return docs
 
+@instrumented('update_document')
 def update_document(collection_name, document_id, data): # update document in collection
     doc = load_document(collection_name, document_id)
     if doc is None:
         return False
-    db.collection(collection_name).document(document_id).set(data, merge=True)
+    get_backend().set(collection_name, document_id, data, merge=True)
+    _mirror_write(collection_name, document_id, data, merge=True)
     return True
 
+@instrumented('save_documents')
+def save_documents(writes): # atomically create or update documents, writes = [(collection_name, document_id, data)]
+    # create vs update is resolved inside the same transaction, new documents get 'created'
+    created = get_backend().save(writes, {'created': get_timestamp()})
+    for collection_name, document_id, data in writes:
+        _cache_add(collection_name) # writing a document creates its collection
+        _mirror_write(collection_name, document_id, data, merge=True)
+    return created
+
+BULK_ATTEMPTS = 5 # tries per document before an import gives up on it
+BULK_RATE = 500 # write operations per second during imports
+
+@instrumented('import_documents')
+def import_documents(collection_name, docs, create_only=False, ops_per_second=BULK_RATE): # stream {'id', **fields} documents into collection as whole documents
+    # batched and retried by the backend, returns {'written', 'exists', 'failed'} counts
+    def writes():
+        for doc in docs:
+            data = dict(doc)
+            doc_id = data.pop('id', None) or uuid.uuid4().hex[:20]
+            yield collection_name, doc_id, data
+
+    def on_result(collection, doc_id, data, outcome):
+        if outcome == 'written':
+            _mirror_write(collection, doc_id, data)
+
+    counts = get_backend().bulk(writes(), create_only, on_result if mirror is not None else None, BULK_ATTEMPTS, ops_per_second)
+    if counts['written']:
+        _cache_add(collection_name) # writing a document creates its collection
+    return counts
+
+@instrumented('delete_document')
 def delete_document(collection_name, document_id): # TODO: add confirmation display on main app
     if not check_collection(collection_name):
         return
     if not document_id:
         return
-    db.collection(collection_name).document(document_id).delete()
+    get_backend().delete(collection_name, document_id)
+    if mirror is not None:
+        mirror.delete(collection_name, document_id)
     return
 
+# editor operations, fanned out over dependent collections (None = base collection)
+
+def document_id_taken(col_id, doc_id, collections): # check all dependent collections if document ID exists (one existence read)
+    keys = [(col_id if not col else col, doc_id) for col in collections]
+    return any(doc is not None for doc in load_documents_batch(keys, fields=()))
+
+def generate_document_id(col_id, collections): # unique document ID
+    while True:
+        s = str(uuid.uuid4())
+        if not document_id_taken(col_id, s, collections):
+            return s
+
+def load_fanout(col_id, doc_id, collections): # collection -> document (None if missing), one read for every collection
+    collections = list(collections)
+    keys = [(col_id if not collection else collection, doc_id) for collection in collections]
+    return dict(zip(collections, load_documents_batch(keys)))
+
+def save_fanout(col_id, doc_id, writes): # writes = {collection: data}, one transaction for every collection
+
+    # check if each dependent collection exists
+    missing = [collection for collection in writes if collection and not check_collection(collection)]
+
+    doc_id = generate_document_id(col_id, writes) if not doc_id else doc_id
+
+    collections = list(writes)
+    batch = []
+    for collection in collections:
+
+        # get collection
+        col = col_id if not collection else collection
+
+        # update timestamp
+        data = dict(writes[collection])
+        data['updated'] = get_timestamp()
+
+        batch.append((col, doc_id, data))
+
+    created = dict(zip(collections, save_documents(batch)))
+
+    return {"doc_id": doc_id, "missing": missing, "created": created}
+
 def get_timestamp():
-    return firestore.SERVER_TIMESTAMP
\ No newline at end of file
+    return get_backend().server_timestamp()
@@ -0,0 +1,116 @@
+import bisect
+from PyQt5 import QtCore
+
+from pages.worker import Worker
+from pages.check import list_documents_page
+
+class DocumentListModel(QtCore.QAbstractListModel): # document IDs of one collection, fetched a cursor page at a time as the view scrolls
+
+    PAGE_SIZE = 200 # IDs per page
+
+    pageLoaded = QtCore.pyqtSignal(int) # rows loaded so far
+    pageFailed = QtCore.pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool.globalInstance()
+        self.collection = None
+        self.tag = None
+        self._ids = [] # sorted by document ID, the order pages arrive in
+        self._members = set()
+        self._cursor = None # last ID of the latest page
+        self._exhausted = True
+        self._worker = None # page request in flight
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.isValid() and role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self._ids[index.row()]
+        return None
+
+    # start over with another collection (None = empty list)
+    def reset(self, collection=None, tag=None):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker.withdraw(self.pool)
+            self._worker = None
+        self.beginResetModel()
+        self.collection = collection
+        self.tag = tag
+        self._ids = []
+        self._members = set()
+        self._cursor = None
+        self._exhausted = not collection
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self._exhausted and self._worker is None
+
+    # request the next page (rows are appended when it arrives)
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        worker = Worker(list_documents_page, self.collection, self.tag, (), self.PAGE_SIZE, self._cursor)
+        self._worker = worker
+        worker.signals.finished.connect(lambda result, w=worker: self._on_page(w, result))
+        worker.signals.failed.connect(lambda error, w=worker: self._on_failed(w, error))
+        worker.submit(self.pool)
+
+    def _on_page(self, worker, result):
+        if worker is not self._worker: # superseded by a reset
+            return
+        self._worker = None
+        docs, cursor = result
+        ids = [doc['id'] for doc in docs if doc['id'] not in self._members] # live inserts may already be listed
+        if ids:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self._ids), len(self._ids) + len(ids) - 1)
+            self._ids.extend(ids)
+            self._members.update(ids)
+            self.endInsertRows()
+        if docs:
+            self._cursor = docs[-1]['id']
+        self._exhausted = cursor is None
+        self.pageLoaded.emit(len(self._ids))
+
+    def _on_failed(self, worker, error):
+        if worker is not self._worker:
+            return
+        self._worker = None
+        self.pageFailed.emit(error)
+
+    def contains(self, doc_id):
+        return doc_id in self._members
+
+    def loaded_until(self): # (listed, last listed ID), the ID is None once every page is listed
+        if self._exhausted:
+            return True, None
+        return self._cursor is not None, self._cursor
+
+    def missing_ids(self, ids, end_at=None): # listed IDs (up to end_at) absent from a full listing of that range
+        ids = set(ids)
+        return [doc_id for doc_id in self._ids if (end_at is None or doc_id <= end_at) and doc_id not in ids]
+
+    # live additions, only within the loaded range (later IDs arrive with their page)
+    def insert_ids(self, ids):
+        for doc_id in ids:
+            if doc_id in self._members:
+                continue
+            if not self._exhausted and (self._cursor is None or doc_id > self._cursor):
+                continue
+            row = bisect.bisect_left(self._ids, doc_id)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._ids.insert(row, doc_id)
+            self._members.add(doc_id)
+            self.endInsertRows()
+
+    def remove_ids(self, ids):
+        for doc_id in ids:
+            if doc_id not in self._members:
+                continue
+            row = bisect.bisect_left(self._ids, doc_id)
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            del self._ids[row]
+            self._members.discard(doc_id)
+            self.endRemoveRows()
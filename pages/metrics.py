@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import functools
+import threading
+
+# per-call instrumentation of the data layer, off unless enabled (FIRESTORE_METRICS=PATH dumps JSON there on exit)
+
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000] # histogram upper bounds, last bucket is open
+
+enabled = False
+dump_path = None
+
+_lock = threading.Lock()
+_stats = {} # (operation, collection) -> Stat
+
+class Stat:
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms, nbytes, error):
+        self.count += 1
+        self.errors += error
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.bytes += nbytes
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, p): # upper bound of the bucket holding the p-th percentile
+        target = self.count * p
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + [None], self.buckets):
+            seen += n
+            if n and seen >= target:
+                return bound if bound is not None else round(self.max_ms, 1)
+        return None
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 2),
+            "bytes": self.bytes,
+            "histogram_ms": {f"<={bound}" if bound is not None else f">{BUCKETS_MS[-1]}": n for bound, n in zip(BUCKETS_MS + [None], self.buckets) if n},
+        }
+
+def enable(path=None): # start recording, dump to path on exit if given
+    global enabled, dump_path
+    enabled = True
+    if path and dump_path is None:
+        atexit.register(lambda: dump(dump_path))
+    dump_path = path or dump_path
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def record(operation, collection, ms, nbytes=0, error=False):
+    with _lock:
+        stat = _stats.get((operation, collection))
+        if stat is None:
+            stat = _stats[(operation, collection)] = Stat()
+        stat.add(ms, nbytes, error)
+
+def payload_size(value): # rough wire size of documents and arguments
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + payload_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(item) for item in value)
+    return 8
+
+def _collection_of(args):
+    if args and isinstance(args[0], str):
+        return args[0]
+    if args and isinstance(args[0], list): # [(collection, ...)] batches
+        return "+".join(sorted({str(item[0]) for item in args[0]}))
+    return "-"
+
+def instrumented(operation): # decorator for pages.check functions, a single flag check when disabled
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                record(operation, _collection_of(args), (time.perf_counter() - start) * 1000, error=True)
+                raise
+            ms = (time.perf_counter() - start) * 1000
+            sent = args[1:] if args and isinstance(args[0], str) else args # collection name is not payload
+            record(operation, _collection_of(args), ms, payload_size(sent) + payload_size(kwargs) + payload_size(result))
+            return result
+        return wrapper
+    return wrap
+
+def snapshot(): # JSON-ready figures, operation -> collection -> stats
+    with _lock:
+        data = {}
+        for (operation, collection), stat in sorted(_stats.items()):
+            data.setdefault(operation, {})[collection] = stat.to_dict()
+        return data
+
+def dump(path=None): # write figures as JSON, returns the path
+    path = path or dump_path or "metrics.json"
+    with open(path, "w") as file:
+        json.dump(snapshot(), file, indent=4)
+    return path
+
+def summary(limit=3): # one line for status displays, operations with the most total time first
+    # per operation only, nested calls (load_document -> refresh_collections) would be counted twice in a grand total
+    with _lock:
+        if not _stats:
+            return "No calls recorded"
+        slowest = sorted(_stats.items(), key=lambda item: item[1].total_ms, reverse=True)[:limit]
+        return " | ".join(
+            f"{operation}({collection}) {stat.count}x {stat.total_ms:.0f} ms p95<={stat.percentile(0.95)} ms {stat.bytes / 1024:.1f} KB"
+            for (operation, collection), stat in slowest
+        )
+
+if os.environ.get('FIRESTORE_METRICS'):
+    enable(os.environ['FIRESTORE_METRICS'])
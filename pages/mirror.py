@@ -0,0 +1,130 @@
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+# JSON encoding that round-trips timestamps
+def _encode(o):
+    if isinstance(o, datetime):
+        return {"__datetime__": o.isoformat()}
+    raise TypeError(f"Object of type {type(o).__name__} is not mirrored")
+
+def _decode(o):
+    if "__datetime__" in o:
+        return datetime.fromisoformat(o["__datetime__"])
+    return o
+
+def dumps(data):
+    return json.dumps(data, default=_encode)
+
+def loads(text):
+    return json.loads(text, object_hook=_decode)
+
+def stamp(value): # comparable form of an 'updated' timestamp
+    return value.isoformat() if isinstance(value, datetime) else None
+
+class Mirror: # local on-disk copy of Firestore documents (SQLite, safe to share across threads)
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated TEXT,
+                    checked REAL NOT NULL,
+                    PRIMARY KEY (collection, id)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS collections (
+                    collection TEXT PRIMARY KEY,
+                    updated TEXT,
+                    checked REAL NOT NULL
+                )
+            """)
+
+    # single documents
+
+    def get(self, collection, doc_id): # (data, updated, checked) or None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data, updated, checked FROM documents WHERE collection = ? AND id = ?",
+                (collection, doc_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return loads(row[0]), row[1], row[2]
+
+    def put(self, collection, doc_id, data, fresh=True, merge=False): # fresh = just read from Firestore
+        with self.lock, self.conn:
+            if merge:
+                row = self.conn.execute(
+                    "SELECT data FROM documents WHERE collection = ? AND id = ?",
+                    (collection, doc_id),
+                ).fetchone()
+                if row is not None:
+                    data = {**loads(row[0]), **data}
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data, updated, checked) VALUES (?, ?, ?, ?, ?)",
+                (collection, doc_id, dumps(data), stamp(data.get('updated')) if fresh else None, time.time() if fresh else 0),
+            )
+
+    def touch(self, collection, doc_id): # revalidated without changes
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE documents SET checked = ? WHERE collection = ? AND id = ?",
+                (time.time(), collection, doc_id),
+            )
+
+    def delete(self, collection, doc_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+
+    # whole collections
+
+    def all(self, collection):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, data FROM documents WHERE collection = ? ORDER BY id",
+                (collection,),
+            ).fetchall()
+        return [{'id': doc_id, **loads(data)} for doc_id, data in rows]
+
+    def synced(self, collection): # (latest 'updated' stamp, checked) or None if never synced
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT updated, checked FROM collections WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+        return row
+
+    def sync(self, collection, docs, ids=None): # upsert fetched docs, drop anything not in ids (None = docs is complete)
+        now = time.time()
+        with self.lock, self.conn:
+            if ids is None:
+                self.conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+            else:
+                known = [row[0] for row in self.conn.execute("SELECT id FROM documents WHERE collection = ?", (collection,))]
+                self.conn.executemany(
+                    "DELETE FROM documents WHERE collection = ? AND id = ?",
+                    [(collection, doc_id) for doc_id in known if doc_id not in ids],
+                )
+            for doc in docs:
+                data = {k: v for k, v in doc.items() if k != 'id'}
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO documents (collection, id, data, updated, checked) VALUES (?, ?, ?, ?, ?)",
+                    (collection, doc['id'], dumps(data), stamp(data.get('updated')), now),
+                )
+            latest = self.conn.execute(
+                "SELECT MAX(updated) FROM documents WHERE collection = ?",
+                (collection,),
+            ).fetchone()[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO collections (collection, updated, checked) VALUES (?, ?, ?)",
+                (collection, latest, now),
+            )
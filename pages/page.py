@@ -1,8 +1,14 @@
-import uuid
-from PyQt5 import QtWidgets, QtCore
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
-from pages.check import check_collection, load_documents, create_document, load_document, update_document, get_timestamp
+import time
+import hashlib
+from collections import deque
+from PyQt5 import QtWidgets, QtCore, QtGui
+
+from pages import metrics, autosave
+from pages.worker import Worker
+from pages.documents import DocumentListModel
+from pages.preview import shared_preview
+from pages.search import SearchIndex, SEARCH_FIELDS, build_index
+from pages.check import check_collection, watch_document_ids, document_id_taken, generate_document_id, load_fanout, save_fanout
 
 WIDGET_MAP = {
     'lineedit': QtWidgets.QLineEdit,
@@ -12,7 +18,19 @@ WIDGET_MAP = {
 
 class CollectionEditorPage(QtWidgets.QWidget):
 
+    TITLE = "Collection Editor" # shown on the page type button before the page is built
+
+    RENDER_DELAY = 150 # ms of typing quiet before the preview re-renders
+
+    METRICS_INTERVAL = 1000 # ms between live metrics refreshes
+
+    JOURNAL_DELAY = 250 # ms of typing quiet before edits are journaled for autosave
+
+    COMPLETIONS = 20 # ranked search results shown under the document ID field
+
     collectionCreated = QtCore.pyqtSignal(object) # not this class's problem anymore
+    documentsChanged = QtCore.pyqtSignal(object) # listener deltas, delivered on the UI thread
+    autosaved = QtCore.pyqtSignal(object) # background writes of journaled edits, delivered on the UI thread
 
     def __init__(self, collection=None, doc_id=None, fields={}, tag=None, intended_collections=[], theme='dark', title="Collection Editor"):
         super().__init__()
@@ -29,6 +47,39 @@ class CollectionEditorPage(QtWidgets.QWidget):
         # title + route
         self.title = title
 
+        # background requests (kind -> worker) and busy indicators (kind -> text)
+        self.pool = QtCore.QThreadPool.globalInstance()
+        self._requests = {}
+        self._busy = {}
+        self._last_message = ""
+
+        # live document listener for the listed part of the active collection
+        self._watch = None
+        self._watch_collection = None
+        self._watch_id = 0 # bumped per listener, earlier listeners' events are dropped
+        self.documentsChanged.connect(self._on_documents_changed)
+
+        # stored field digests of the loaded document (collection -> field -> digest), saves only send fields that differ
+        self._baseline = {}
+        self._baseline_doc = None
+
+        # autosave (FIRESTORE_AUTOSAVE), field digests already journaled since the baseline
+        self.autosaver = autosave.autosaver
+        self._journaled = {}
+        if self.autosaver is not None:
+            self._journal_timer = QtCore.QTimer(self)
+            self._journal_timer.setSingleShot(True)
+            self._journal_timer.setInterval(self.JOURNAL_DELAY)
+            self._journal_timer.timeout.connect(self._journal_edits)
+            self.autosaved.connect(self._on_autosaved)
+            self.autosaver.listeners.append(lambda collection, doc_id, writes, error: self.autosaved.emit(
+                {"collection": collection, "doc_id": doc_id, "writes": writes, "error": error}
+            ))
+
+        # text search over the active collection (documents loaded or saved while the index builds are re-applied)
+        self.search_index = SearchIndex()
+        self._index_updates = {}
+
         # field wrapper
         hbox = QtWidgets.QHBoxLayout(self)
 
@@ -45,6 +96,30 @@ class CollectionEditorPage(QtWidgets.QWidget):
         self.doc_id_input.setEditable(True)
         form.addRow("Document ID", self.doc_id_input)
 
+        # document IDs paged in from the active collection as the list scrolls
+        self.documents = DocumentListModel(self)
+        self.doc_id_input.setModel(self.documents)
+        self.doc_id_input.setInsertPolicy(QtWidgets.QComboBox.NoInsert) # typed IDs are not list entries
+        self.documents.pageLoaded.connect(self._on_page_loaded)
+        self.documents.pageFailed.connect(self._on_page_failed)
+
+        # Qt selects the first row when rows arrive in an empty list (and moves the selection on removals),
+        # the ID in the field is put back so a save never lands on another document
+        self._edit_text = None
+        self.documents.rowsAboutToBeInserted.connect(self._save_edit_text)
+        self.documents.rowsAboutToBeRemoved.connect(self._save_edit_text)
+        self.documents.rowsInserted.connect(self._restore_edit_text)
+        self.documents.rowsRemoved.connect(self._restore_edit_text)
+
+        # as-you-type search results, completing to the document ID
+        self.completions = QtGui.QStandardItemModel(self)
+        self.completer = QtWidgets.QCompleter(self.completions, self)
+        self.completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCompletionRole(QtCore.Qt.UserRole)
+        self.doc_id_input.setCompleter(self.completer)
+        self.doc_id_input.lineEdit().textEdited.connect(self.update_completions)
+        self.completer.activated[QtCore.QModelIndex].connect(self._on_completion)
+
         # initialize collection and document fields
         self.set_collection({ "id": collection, "doc_id": doc_id })
 
@@ -66,6 +141,8 @@ class CollectionEditorPage(QtWidgets.QWidget):
             
             # create actual widget
             widget = self._create_widget(config)
+            if self.autosaver is not None:
+                self._connect_change_signal(widget, self.schedule_autosave)
             self.field_widgets[field] = widget
             form.addRow(config.get('label', field), widget)
         
@@ -74,16 +151,28 @@ class CollectionEditorPage(QtWidgets.QWidget):
         form.addRow("", self.save_btn)
         self.save_btn.clicked.connect(self.save_document)
 
-        # TODO: fix load button
-        if self.collection: # if existing collection
-            self.load_btn = QtWidgets.QPushButton("Load by ID")
-            form.addRow("", self.load_btn)
-            self.load_btn.clicked.connect(self.load_document)
+        # load button (only shown for existing collections)
+        self.load_btn = QtWidgets.QPushButton("Load by ID")
+        form.addRow("", self.load_btn)
+        self.load_btn.clicked.connect(self.load_document)
+        self.load_btn.setVisible(bool(self.collection))
         
         # status field
         self.status_label = QtWidgets.QLabel("")
         form.addRow("", self.status_label)
 
+        # live data layer figures (FIRESTORE_METRICS), Ctrl+Shift+M dumps them as JSON
+        self.metrics_label = None
+        if metrics.enabled:
+            self.metrics_label = QtWidgets.QLabel(metrics.summary())
+            self.metrics_label.setWordWrap(True)
+            form.addRow("", self.metrics_label)
+            self._metrics_timer = QtCore.QTimer(self)
+            self._metrics_timer.setInterval(self.METRICS_INTERVAL)
+            self._metrics_timer.timeout.connect(self.update_metrics)
+            self._metrics_timer.start()
+            QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+M"), self, self.dump_metrics)
+
         # display
         render_box = QtWidgets.QFormLayout()
         hbox.addLayout(render_box, 1)
@@ -92,29 +181,113 @@ class CollectionEditorPage(QtWidgets.QWidget):
         self.rendered_label = QtWidgets.QLabel("Collection Type: " + title)
         render_box.addRow(self.rendered_label)
 
-        # web view
-        self.web = QWebEngineView()
-        render_box.addRow(self.web)
+        # preview (shared web view, moved into whichever page is visible)
+        self.preview = shared_preview()
+        self.preview_box = QtWidgets.QVBoxLayout()
+        self.preview_box.setContentsMargins(0, 0, 0, 0)
+        preview_holder = QtWidgets.QWidget()
+        preview_holder.setLayout(self.preview_box)
+        preview_holder.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        render_box.addRow(preview_holder)
         self.htmlLoaded = False
+        self._frame = None
+
+        # render scheduler (debounced, at most one render in flight)
+        self._render_timer = QtCore.QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(self.RENDER_DELAY)
+        self._render_timer.timeout.connect(self._dispatch_render)
+        self._render_inflight = False
+        self._render_pending = False
+        self.render_times = deque(maxlen=100) # (js ms, round trip ms) per rendered frame
 
         # connections
-        self.web.loadFinished.connect(self.on_html_loaded)
+        self.preview.frameLoaded.connect(self._on_frame_loaded)
         self.doc_id_input.activated.connect(self.load_document)
 
-        # setup HTML
-        self.web.setHtml(self.gen_html())
-        self.web.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-
     # update status field
     def message(self, msg, silent=False):
         if hasattr(self, "status_label") and not silent:
             print(msg)
+            self._last_message = msg
             self.status_label.setText(msg)
 
     # special message
     def warning(self, msg):
         self.message(f"WARNING: {msg}", silent=False)
 
+    # refresh live data layer figures (only while visible)
+    def update_metrics(self):
+        if self.metrics_label is not None and self.isVisible():
+            self.metrics_label.setText(metrics.summary())
+
+    # write data layer figures as JSON
+    def dump_metrics(self):
+        try:
+            path = metrics.dump()
+        except OSError as e:
+            self.warning(f"Metrics Dump Failed ({e})")
+            return
+        self.message(f"Metrics Written to {path}")
+
+    # run blocking I/O on the thread pool, superseding any pending request of the same kind
+    def run_async(self, kind, fn, *args, on_done=None, busy="Working..."):
+
+        # cancel stale request
+        self.cancel_request(kind)
+
+        worker = Worker(fn, *args)
+        self._requests[kind] = worker
+
+        # results arrive on the UI thread
+        worker.signals.finished.connect(lambda result, w=worker: self._request_finished(kind, w, result, on_done))
+        worker.signals.failed.connect(lambda error, w=worker: self._request_failed(kind, w, error))
+
+        self._set_busy(kind, busy)
+        worker.submit(self.pool)
+
+    # drop a pending request (queued work never starts, running work never reports back)
+    def cancel_request(self, kind):
+        worker = self._requests.pop(kind, None)
+        if worker is None:
+            return
+        worker.cancel()
+        worker.withdraw(self.pool)
+        self._clear_busy(kind)
+
+    def _request_finished(self, kind, worker, result, on_done):
+        if self._requests.get(kind) is not worker: # superseded
+            return
+        del self._requests[kind]
+        self._clear_busy(kind)
+        if on_done:
+            on_done(result)
+
+    def _request_failed(self, kind, worker, error):
+        if self._requests.get(kind) is not worker: # superseded
+            return
+        del self._requests[kind]
+        self._clear_busy(kind)
+        if kind == "save":
+            self.save_btn.setEnabled(True)
+        self.warning(f"{kind.capitalize()} Failed ({error})")
+
+    # busy indicator in status field
+    def _set_busy(self, kind, text):
+        self._busy[kind] = text
+        if hasattr(self, "status_label"):
+            self.status_label.setText(text)
+
+    def _clear_busy(self, kind):
+        if self._busy.pop(kind, None) is None:
+            return
+        if not hasattr(self, "status_label"):
+            return
+        if self._busy: # another request still running
+            self.status_label.setText(list(self._busy.values())[-1])
+        else:
+            self.status_label.setText(self._last_message)
+
     # create widget from config
     def _create_widget(self, config):
 
@@ -164,27 +337,74 @@ class CollectionEditorPage(QtWidgets.QWidget):
         elif isinstance(widget, QtWidgets.QComboBox):
             widget.setCurrentText(value)
 
+    # take over the shared preview when this page becomes visible
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.show_preview()
+
+    def show_preview(self):
+        self.preview.attach(self.preview_box)
+        self._frame = self.preview.show(self.gen_html())
+        if self.preview.loaded(self._frame): # template already resident
+            self.htmlLoaded = True
+            self.schedule_render()
+
+    def _on_frame_loaded(self, key):
+        if key == self._frame and not self.htmlLoaded:
+            self.on_html_loaded()
+
     # what to do when web engine finishes loading
     def on_html_loaded(self):
         self.htmlLoaded = True
-        self.load_document(silent=True)
+        self.load_document(silent=True, select=True) # the ID selected before the page was ready
+        self.schedule_render()
+
+    # coalesce rapid edits into one render after RENDER_DELAY
+    def schedule_render(self):
+        if hasattr(self, "_render_timer"):
+            self._render_timer.start()
+
+    def _dispatch_render(self):
+
+        if not hasattr(self, "htmlLoaded") or not self.htmlLoaded: # check if web engine loaded
+            return
+
+        if not self.isVisible(): # preview frame may be shared with the visible page
+            return
+
+        if self._render_inflight: # superseded, only the latest text renders next
+            self._render_pending = True
+            return
+
+        script = self.render_script()
+        if not script:
+            return
+
+        self._render_inflight = True
+        start = time.perf_counter()
+        self.preview.run(self._frame, script, lambda result, start=start, size=len(script): self._render_done(result, start, size))
+
+    def _render_done(self, result, start, size=0):
+        self._render_inflight = False
+        elapsed = (time.perf_counter() - start) * 1000
+        self.render_times.append((result if isinstance(result, (int, float)) else None, elapsed))
+        if metrics.enabled: # web view time next to the data layer calls
+            metrics.record('render', self.title, elapsed, size)
+        if self._render_pending:
+            self._render_pending = False
+            self._dispatch_render()
+
+    # javascript that renders the current fields, evaluating to its render time in ms (to be overridden)
+    def render_script(self):
+        return ""
 
     # check all dependent collections if document ID exists
     def check_id(self, col_id, doc_id):
-        for col in self.field_collection:
-            col = col_id if not col else col
-            doc = load_document(col, doc_id)
-            if doc:
-                return True
-        return False
+        return document_id_taken(col_id, doc_id, self.field_collection)
 
     # generate unique document ID
     def gen_id(self, col_id):
-        s = ""
-        while True:
-            s = uuid.uuid4()
-            if not self.check_id(col_id, str(s)):
-                return str(s)
+        return generate_document_id(col_id, self.field_collection)
 
     # save document
     def save_document(self, silent=False):
@@ -199,55 +419,98 @@ class CollectionEditorPage(QtWidgets.QWidget):
             self.message("Empty Collection ID", silent=silent)
             return
         
-        # check if each dependent collection exists
-        for collection in self.field_collection:
-            if not collection or check_collection(collection):
-                continue
-            self.warning(f"\"{collection}\" Does Not Exist (Proceeding Anyway)") # TODO display alert on actual app
-        
-        # current document ID
+        # current document ID (generated in background if empty)
         doc_id = self.doc_id_input.currentText().strip()
-        doc_id = self.gen_id(col_id) if not doc_id else doc_id
 
         for field in self.fields: # valid data check
             if not ''.join(self.get_field_value(field).split(' ')):
                 self.message(f"Empty \"{field}\" Field", silent=silent)
                 return
 
-        # update document ID field
-        self.doc_id_input.setCurrentText(doc_id)
+        # snapshot data for each dependent collection
+        values = {field: self.get_field_value(field) for field in self.fields}
+        writes = self._collect_writes(values, self._baseline if doc_id and doc_id == self._baseline_doc else {})
+
+        if not writes:
+            self.message(f"No Changes to \"{doc_id}\"", silent=silent)
+            return
 
-        # save data for each dependent collection
+        # this save covers every journaled edit of the document
+        seq = self.autosaver.discard(col_id, doc_id) if self.autosaver is not None and doc_id else 0
+        self._journaled = {}
+
+        # one save at a time, so an empty ID is never allocated twice
+        self.save_btn.setEnabled(False)
+        self.run_async(
+            "save", self._save_job, col_id, doc_id, writes,
+            on_done=lambda result: self._on_saved(result, col_id, silent, writes, values, seq),
+            busy=f"Saving \"{doc_id}\"..." if doc_id else "Saving...",
+        )
+
+    # data for each dependent collection, only fields that differ from the baseline (collection -> field -> digest)
+    def _collect_writes(self, values, baseline):
+        writes = {}
         for collection in self.field_collection:
 
             data = {}
 
             for field in self.field_collection[collection]:
-                data[field] = self.get_field_value(field)
-
-            # get collection
-            col = col_id if not collection else collection
+                data[field] = values[field]
 
             # add tags if saving to base collection
             if self.tag and not collection:
                 data['tag'] = self.tag
 
-            # update timestamp
-            data['updated'] = get_timestamp()
+            # loaded document: changed fields only, unchanged collections are skipped
+            if collection in baseline:
+                data = {field: value for field, value in data.items() if baseline[collection].get(field) != self._digest(value)}
+                if not data:
+                    continue
+
+            writes[collection] = data
+
+        return writes
+
+    # save worker (no widget access)
+    def _save_job(self, col_id, doc_id, writes):
+        return save_fanout(col_id, doc_id, writes)
+
+    def _on_saved(self, result, col_id, silent, writes=None, values=None, seq=0):
+
+        self.save_btn.setEnabled(True)
+
+        if seq: # journaled edits up to the save are in Firestore
+            self.autosaver.synced(col_id, result["doc_id"], seq)
 
-            # create or update document
-            if not update_document(col, doc_id, data): # new document
-                data['created'] = get_timestamp()
-                create_document(col, doc_id, data)
+        for collection in result["missing"]:
+            self.warning(f"\"{collection}\" Does Not Exist (Proceeding Anyway)") # TODO display alert on actual app
+
+        # update document ID field
+        doc_id = result["doc_id"]
+        self.doc_id_input.setCurrentText(doc_id)
+
+        # written values are the new baseline
+        if writes is not None:
+            if doc_id != self._baseline_doc:
+                self._baseline = {}
+                self._baseline_doc = doc_id
+                self._journaled = {}
+            for collection, data in writes.items():
+                self._baseline.setdefault(collection, {}).update({field: self._digest(value) for field, value in data.items()})
+
+        for created in result["created"].values():
+            if created:
                 self.message(f"Created \"{doc_id}\"", silent=silent)
             else:
                 self.message(f"Updated \"{doc_id}\"", silent=silent)
 
         if not self.collection: # new collection created
             self.collectionCreated.emit({"id": col_id, "doc_id": doc_id})
+        elif values and col_id == self.collection: # keep search results current
+            self.index_document(doc_id, values)
 
     # load document
-    def load_document(self, silent=False): # silent = warnings or no (for inital load)
+    def load_document(self, silent=False, select=False): # silent = warnings or no (for inital load), select = clear the ID if it does not exist
 
         if not hasattr(self, "htmlLoaded") or not self.htmlLoaded: # check if web engine loaded
             return
@@ -265,15 +528,32 @@ class CollectionEditorPage(QtWidgets.QWidget):
         if not doc_id: # document ID check
             self.message("Empty Document ID", silent=silent)
             return
-        
-        # loading data for each dependent collection TODO: handle conflicting data (same field from different collections)
-        for collection in self.field_collection:
 
-            # get collection
-            col_id = self.collection if not collection else collection
+        # switching documents supersedes any load still in flight
+        self.run_async(
+            "load", self._load_job, col_id, doc_id,
+            on_done=lambda docs: self._on_loaded(docs, doc_id, silent, select),
+            busy=f"Loading \"{doc_id}\"...",
+        )
+
+    # load worker (no widget access)
+    def _load_job(self, col_id, doc_id):
+        return load_fanout(col_id, doc_id, self.field_collection)
+
+    def _on_loaded(self, docs, doc_id, silent, select=False):
+
+        # nothing stored under this ID, so there is no baseline (autosave only writes documents that exist)
+        if not any(docs.values()):
+            self._baseline = {}
+            self._baseline_doc = None
+            self._journaled = {}
+            if select and self.doc_id_input.currentText().strip() == doc_id: # carried over from a collection that has it
+                self.doc_id_input.setCurrentText("")
+            self.message(f"Document \"{doc_id}\" Does Not Exist", silent=silent)
+            return
 
-            # load document
-            doc_dict = load_document(col_id, doc_id)
+        # loading data for each dependent collection TODO: handle conflicting data (same field from different collections)
+        for collection, doc_dict in docs.items():
 
             if not doc_dict: # None if document doesn't exist
                 continue
@@ -281,12 +561,74 @@ class CollectionEditorPage(QtWidgets.QWidget):
             # set field values
             for field in self.field_collection[collection]:
                 self.set_field_value(field, doc_dict.get(field))
+
+        # stored values, for detecting changed fields on save
+        self._journaled = {}
+        self._baseline_doc = doc_id
+        self._baseline = {
+            collection: {field: self._digest(doc_dict.get(field)) for field in self.field_collection[collection] + (['tag'] if self.tag and not collection else [])}
+            for collection, doc_dict in docs.items() if doc_dict
+        }
+
+        # refresh search entry from the loaded text
+        fields = {}
+        for collection, doc_dict in docs.items():
+            if doc_dict:
+                fields.update({field: doc_dict.get(field) for field in self.field_collection[collection]})
+        if fields:
+            self.index_document(doc_id, fields)
         
         # status update
         self.message(f"Loaded document \"{doc_id}\"", silent=silent)
 
+    # journal edits of the loaded document shortly after typing stops
+    def schedule_autosave(self, *_):
+        if hasattr(self, "_journal_timer"):
+            self._journal_timer.start()
+
+    def _journal_edits(self):
+
+        # only documents that exist (loaded or saved), with the same checks as saving
+        col_id = self.collection
+        doc_id = self.doc_id_input.currentText().strip()
+        if not col_id or not doc_id or doc_id != self._baseline_doc:
+            return
+        values = {field: self.get_field_value(field) for field in self.fields}
+        if any(not ''.join(value.split(' ')) for value in values.values()):
+            return
+
+        # fields changed since they were last journaled
+        baseline = {collection: {**digests, **self._journaled.get(collection, {})} for collection, digests in self._baseline.items()}
+        writes = self._collect_writes(values, baseline)
+        if not writes:
+            return
+
+        self.autosaver.edit(col_id, doc_id, writes)
+        for collection, data in writes.items():
+            self._journaled.setdefault(collection, {}).update({field: self._digest(value) for field, value in data.items()})
+
+    def _on_autosaved(self, msg):
+
+        if msg["error"] is not None:
+            self.warning(f"Autosave of \"{msg['doc_id']}\" Failed, Retrying ({msg['error']})")
+            return
+
+        # written values are the new baseline
+        if msg["collection"] == self.collection and msg["doc_id"] == self._baseline_doc:
+            for collection, data in msg["writes"].items():
+                self._baseline.setdefault(collection, {}).update({field: self._digest(value) for field, value in data.items()})
+            self.message(f"Autosaved \"{msg['doc_id']}\"")
+
+    # fingerprint of a field value (missing fields load as empty text)
+    @staticmethod
+    def _digest(value):
+        return hashlib.blake2b(("" if value is None else str(value)).encode(), digest_size=16).digest()
+
     # clear text fields
     def clear_fields(self):
+        self._baseline = {}
+        self._baseline_doc = None
+        self._journaled = {}
         if hasattr(self, "collection_label"):
             self.collection_label.setText("")
         if hasattr(self, "doc_id_input"):
@@ -295,6 +637,7 @@ class CollectionEditorPage(QtWidgets.QWidget):
             for field in self.field_widgets:
                 self.set_field_value(field, "")
         if hasattr(self, "status_label"):
+            self._last_message = ""
             self.status_label.setText("")
 
     # generate HTML content (to be overridden)
@@ -306,6 +649,7 @@ class CollectionEditorPage(QtWidgets.QWidget):
 
         # reset
         self.clear_fields()
+        self.cancel_request("load")
         collection = msg.get("id")
 
         if hasattr(self, "intended"): # check for intention
@@ -315,46 +659,176 @@ class CollectionEditorPage(QtWidgets.QWidget):
         # update collection text
         self.collection_label.setText(collection)
 
+        if collection and collection == self._watch_collection: # listener already keeps the list current
+            self.cancel_request("list")
+            self.collection = collection
+            self.collection_label.setReadOnly(True)
+            self._select_document(msg.get("doc_id"))
+            return
+
+        # read only until existence is known
+        self.unwatch()
+        self.collection = None
+        self.collection_label.setReadOnly(True)
+
+        # update editability and document list
+        self.run_async(
+            "list", check_collection, collection,
+            on_done=lambda exists: self._on_collection(collection, exists, msg.get("doc_id")),
+            busy=f"Loading \"{collection}\"..." if collection else "Loading...",
+        )
+
+    def _on_collection(self, collection, exists, doc_id):
+
         # update editability
-        if check_collection(collection):
+        if exists:
             self.collection = collection
             self.collection_label.setReadOnly(True)
         else:
             self.collection = None
             self.collection_label.setReadOnly(False)
-        
-        # update document list
-        self.set_documents(msg.get("doc_id"))
+
+        if hasattr(self, "load_btn"):
+            self.load_btn.setVisible(bool(self.collection))
+
+        if not exists:
+            self.documents.reset()
+            self.warning(f"Collection \"{collection}\" Does Not Exist")
+            return
+
+        self.set_documents(doc_id)
     
-    # update document list
+    # (re)subscribe document list to the active collection
     def set_documents(self, doc_id=None):
 
-        # clear existing items
-        self.doc_id_input.clear()
-        
-        # get docs
-        docs = load_documents(self.collection)
+        self.unwatch()
+        self.documents.reset()
 
-        if docs is None:
-            self.warning(f"Collection \"{self.collection}\" Does Not Exist")
+        if not self.collection:
             return
 
-        val = False # if 'doc_id' is valid
-
-        # populate document IDs
-        for doc in docs:
+        # first page of IDs now, later pages as the list is scrolled
+        collection = self.collection
+        self.documents.reset(collection, self.tag) # only documents with the correct tag
+        self._set_busy("page", f"Loading \"{collection}\"...")
+        self.documents.fetchMore()
+
+        # listened to as pages arrive (see _watch_listed)
+        self._watch_collection = collection
+
+        # the document may lie beyond the first page, so it is selected without waiting for the list
+        self._select_document(doc_id)
+
+        # search index from a listing projected to the searchable fields
+        fields = [field for field in SEARCH_FIELDS if field in self.field_collection.get(None, [])]
+        self.run_async(
+            "index", build_index, collection, self.tag, fields,
+            on_done=self._on_indexed,
+            busy=f"Indexing \"{collection}\"...",
+        )
+
+    # listen to the listed ID range, re-subscribed as pages arrive, so documents not scrolled to are never downloaded
+    def _watch_listed(self):
+        listed, end_at = self.documents.loaded_until()
+        collection = self._watch_collection
+        if not listed or collection is None:
+            return
+        if self._watch is not None:
+            self._watch.unsubscribe()
+        self._watch_id += 1
+        watch_id = self._watch_id
+
+        first = [True] # the first callback lists the whole range
+        def on_change(added, removed):
+            self.documentsChanged.emit({"watch": watch_id, "added": added, "removed": removed, "snapshot": first[0], "end_at": end_at})
+            first[0] = False
+
+        self._watch = watch_document_ids(collection, self.tag, on_change, end_at=end_at)
+
+    # stop listening to the active collection
+    def unwatch(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+        self._watch = None
+        self._watch_id += 1
+        self._watch_collection = None
+        self._clear_busy("page")
+        self.cancel_request("index")
+        self.search_index = SearchIndex()
+        self._index_updates = {}
+
+    def _on_documents_changed(self, delta):
+
+        if delta["watch"] != self._watch_id: # event from a previous listener (the current one's first snapshot covers it)
+            return
 
-            if self.tag and doc.get('tag') != self.tag: #  not the correct tags
-                continue
+        # removals made while no listener covered the range show up as listed IDs missing from the first snapshot
+        removed = delta["removed"]
+        if delta["snapshot"]:
+            removed = removed + self.documents.missing_ids(delta["added"], delta["end_at"])
+
+        # apply deltas
+        self.documents.remove_ids(removed)
+        for doc_id in removed:
+            self.index_document(doc_id, None)
+        self.documents.insert_ids(delta["added"])
+
+    def _save_edit_text(self, *_):
+        self._edit_text = self.doc_id_input.currentText()
+
+    def _restore_edit_text(self, *_): # runs after the combobox's own handler (connected later)
+        text, self._edit_text = self._edit_text, None
+        if text is not None and self.doc_id_input.currentText() != text:
+            self.doc_id_input.setCurrentIndex(-1)
+            self.doc_id_input.setEditText(text)
+
+    def _on_page_loaded(self, rows):
+        self._clear_busy("page")
+        self._watch_listed()
+
+    def _on_page_failed(self, error):
+        self._clear_busy("page")
+        self.warning(f"List Failed ({error})")
+
+    # add, refresh (fields) or drop (None) one search entry
+    def index_document(self, doc_id, fields):
+        if fields is None:
+            self.search_index.remove(doc_id)
+        else:
+            self.search_index.add(doc_id, fields)
+        if "index" in self._requests: # replayed onto the index being built
+            self._index_updates[doc_id] = fields
+
+    def _on_indexed(self, index):
+        for doc_id, fields in self._index_updates.items():
+            if fields is None:
+                index.remove(doc_id)
+            else:
+                index.add(doc_id, fields)
+        self.search_index = index
+        self._index_updates = {}
+
+    # ranked search results for the typed text
+    def update_completions(self, text):
+        self.completions.clear()
+        for doc_id, _ in self.search_index.search(text, self.COMPLETIONS):
+            title = self.search_index.titles.get(doc_id)
+            item = QtGui.QStandardItem(f"{title}  ({doc_id})" if title else doc_id)
+            item.setData(doc_id, QtCore.Qt.UserRole) # completed into the field
+            self.completions.appendRow(item)
+        if self.completions.rowCount():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
 
-            if doc['id'] == doc_id: # valid doc_id
-                val = True
+    def _on_completion(self, index):
+        self.doc_id_input.setCurrentText(index.data(QtCore.Qt.UserRole))
+        self.load_document()
 
-            self.doc_id_input.addItem(doc['id'])
+    def _select_document(self, doc_id):
 
-        # set current document ID
-        self.doc_id_input.setCurrentText(doc_id if (doc_id and val) else "")
+        # set current document ID (it may lie beyond the loaded pages, so the load checks that it exists)
+        self.doc_id_input.setCurrentText(doc_id or "")
 
         # load document
-        self.load_document(silent=True)
-        
\ No newline at end of file
+        self.load_document(silent=True, select=True)
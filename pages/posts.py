@@ -1,7 +1,10 @@
 from pages.page import CollectionEditorPage
+from pages.assets import katex_url
 
 class PostsPage(CollectionEditorPage):
 
+    TITLE = "Posts"
+
     def __init__(self, collection=None):
 
         fields = {
@@ -12,13 +15,13 @@ class PostsPage(CollectionEditorPage):
             'body': {
                 'type': 'textedit',
                 'label': 'Body',
-                'on_change': self.render_markdown,
+                'on_change': self.schedule_render,
             }
         }
 
         intended_collections = ['posts', 'problems']
 
-        super().__init__(collection=collection, fields=fields, intended_collections=intended_collections, theme='dark', title="Posts")
+        super().__init__(collection=collection, fields=fields, intended_collections=intended_collections, theme='dark', title=self.TITLE)
 
     def gen_html(self):
 
@@ -27,9 +30,8 @@ class PostsPage(CollectionEditorPage):
             <html>
                 <head>
                     <meta charset="utf-8" />
-                    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex@0.16.10/dist/katex.min.css">
-                    <script src="https://cdn.jsdelivr.net/npm/katex@0.16.10/dist/katex.min.js"></script>
-                    <script src="https://cdn.jsdelivr.net/npm/katex@0.16.10/dist/contrib/auto-render.min.js"></script>
+                    <link rel="stylesheet" href="%s">
+                    <script src="%s"></script>
 
                     <style>
                         body {
@@ -58,27 +60,52 @@ class PostsPage(CollectionEditorPage):
 
                     <script>
 
-                        function parseNewlines(text) {
-                            return text
-                            .split('\n\n')
-                            .map(p => `<p class="textParserBlock">${p}</p>`)
-                            .join("");
+                        const mathCache = new Map(); // rendered KaTeX by display mode + source
+                        let blocks = []; // rendered blocks in document order: {key, text, node}
+
+                        function splitBlocks(text) {
+                            return text.split('\n\n');
+                        }
+
+                        function hashBlock(text) { // FNV-1a
+                            let h = 0x811c9dc5;
+                            for (let i = 0; i < text.length; i++) {
+                                h ^= text.charCodeAt(i);
+                                h = Math.imul(h, 0x01000193);
+                            }
+                            return (h >>> 0).toString(36) + ":" + text.length;
+                        }
+
+                        function renderMath(expr, display) {
+                            const key = (display ? "D" : "I") + expr;
+                            let html = mathCache.get(key);
+                            if (html === undefined) {
+                                html = katex.renderToString(expr, { displayMode: display, throwOnError: false });
+                                if (mathCache.size > 5000) mathCache.clear();
+                                mathCache.set(key, html);
+                            }
+                            return html;
                         }
 
-                        function parseBlockMath(html) {
+                        // math is swapped for placeholders so decorations never touch TeX or KaTeX output
+                        function parseBlockMath(html, math) {
                             return html.replace(
                                 /\$\$([\s\S]+?)\$\$/g,
-                                (_, expr) => `<div>\\[${expr.trim()}\\]</div>`
+                                (_, expr) => "\u0000" + (math.push(`<div>${renderMath(expr.trim(), true)}</div>`) - 1) + "\u0000"
                             );
                         }
 
-                        function parseInlineMath(html) {
+                        function parseInlineMath(html, math) {
                             return html.replace(
                                 /\$(.+?)\$/g,
-                                (_, expr) => `\\(${expr}\\)`
+                                (_, expr) => "\u0000" + (math.push(renderMath(expr, false)) - 1) + "\u0000"
                             );
                         }
 
+                        function restoreMath(html, math) {
+                            return html.replace(/\u0000(\d+)\u0000/g, (_, i) => math[i]);
+                        }
+
                         function parseTextDecorations(html) {
                             return html
                             .replace(/\*\*(.+?)\*\*/g, "<strong>$1</strong>")
@@ -93,41 +120,69 @@ class PostsPage(CollectionEditorPage):
                             );
                         }
 
-                        function parseMarkdown(text) {
+                        function parseMarkdown(text) { // one block
+                            const math = [];
                             let html = text;
-                            html = parseNewlines(html);
-                            html = parseBlockMath(html);
-                            html = parseInlineMath(html);
+                            html = parseBlockMath(html, math);
+                            html = parseInlineMath(html, math);
                             html = parseTextDecorations(html);
                             html = parseLinks(html);
-                            return html;
+                            return restoreMath(html, math);
                         }
 
                         function renderContent(text) {
+                            const start = performance.now();
                             const container = document.getElementById("content");
-                            container.innerHTML = parseMarkdown(text);
-                            renderMathInElement(container, {
-                                delimiters: [
-                                    {left: "\\[", right: "\\]", display: true},
-                                    {left: "\\(", right: "\\)", display: false}
-                                ],
-                                throwOnError: false
+
+                            // unchanged blocks are reused by content hash
+                            const previous = new Map();
+                            for (const block of blocks) {
+                                if (!previous.has(block.key)) previous.set(block.key, []);
+                                previous.get(block.key).push(block);
+                            }
+
+                            const next = splitBlocks(text).map(part => {
+                                const key = hashBlock(part);
+                                const candidates = previous.get(key) || [];
+                                const index = candidates.findIndex(block => block.text === part);
+                                if (index >= 0) return candidates.splice(index, 1)[0];
+
+                                const node = document.createElement("div");
+                                node.className = "textParserBlock";
+                                node.innerHTML = parseMarkdown(part);
+                                return { key: key, text: part, node: node };
                             });
+
+                            // patch the DOM in place, moving only blocks that are out of order
+                            let cursor = container.firstChild;
+                            for (const block of next) {
+                                if (block.node === cursor) {
+                                    cursor = cursor.nextSibling;
+                                } else {
+                                    container.insertBefore(block.node, cursor);
+                                }
+                            }
+                            while (cursor) {
+                                const stale = cursor;
+                                cursor = cursor.nextSibling;
+                                container.removeChild(stale);
+                            }
+
+                            blocks = next;
+                            return performance.now() - start;
                         }
                     </script>
                 </body>
             </html>
         """ % (
+            katex_url('katex.min.css'),
+            katex_url('katex.min.js'),
             '#252525' if self.theme == 'light' else '#ffffff',
             '#f9f5f1' if self.theme == 'light' else '#212529',
             '#252525' if self.theme == 'light' else '#ffffff',
             '#898989' if self.theme == 'light' else '#9b9b9b',
         )
 
-    def render_markdown(self):
-        if not hasattr(self, "htmlLoaded") or not self.htmlLoaded:
-            return
+    def render_script(self):
         latex_str = self.field_widgets['body'].toPlainText()
-        js = f"renderContent({latex_str!r});"
-        self.web.page().runJavaScript(js)
-
+        return f"renderContent({latex_str!r});"
@@ -0,0 +1,143 @@
+import json
+import hashlib
+from PyQt5 import QtWidgets, QtCore
+from PyQt5.QtWebChannel import QWebChannel
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
+
+from pages.assets import shared_profile, ASSET_BASE
+
+# one document hosting every preview template in its own (resident) iframe
+SHELL_HTML = r"""
+    <!DOCTYPE html>
+    <html>
+        <head>
+            <meta charset="utf-8" />
+            <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+            <style>
+                html, body {
+                    margin: 0;
+                    height: 100vh;
+                    overflow: hidden;
+                }
+                iframe {
+                    display: none;
+                    border: none;
+                    width: 100vw;
+                    height: 100vh;
+                }
+                iframe.active {
+                    display: block;
+                }
+            </style>
+        </head>
+
+        <body>
+            <script>
+
+                let preview = null;
+                const early = []; // frames loaded before the channel connected
+
+                new QWebChannel(qt.webChannelTransport, channel => {
+                    preview = channel.objects.preview;
+                    early.forEach(key => preview.frameReady(key));
+                });
+
+                function frameReady(key) {
+                    if (preview) preview.frameReady(key);
+                    else early.push(key);
+                }
+
+                window.showFrame = function (key, html) {
+                    let frame = document.getElementById(key);
+                    if (!frame) {
+                        frame = document.createElement("iframe");
+                        frame.id = key;
+                        frame.onload = () => frameReady(key);
+                        frame.srcdoc = html;
+                        document.body.appendChild(frame);
+                    }
+                    for (const other of document.querySelectorAll("iframe")) {
+                        other.classList.toggle("active", other === frame);
+                    }
+                };
+            </script>
+        </body>
+    </html>
+"""
+
+class PreviewSurface(QtCore.QObject): # single web view (one renderer process) shared by every editor page
+
+    frameLoaded = QtCore.pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+
+        # web view
+        self.view = QWebEngineView()
+        self.view.setPage(QWebEnginePage(shared_profile(), self.view)) # vendored assets + shared cache
+        self.view.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+
+        # frames report back through the web channel
+        self.channel = QWebChannel(self.view.page())
+        self.channel.registerObject("preview", self)
+        self.view.page().setWebChannel(self.channel)
+
+        # template key -> loaded
+        self.frames = {}
+
+        # scripts waiting for the shell document
+        self.shellLoaded = False
+        self._queue = []
+        self.view.loadFinished.connect(self._on_shell_loaded)
+        self.view.setHtml(SHELL_HTML, QtCore.QUrl(ASSET_BASE))
+
+    def _on_shell_loaded(self):
+        self.shellLoaded = True
+        for script in self._queue:
+            self.view.page().runJavaScript(script)
+        self._queue = []
+
+    def _run_shell(self, script):
+        if self.shellLoaded:
+            self.view.page().runJavaScript(script)
+        else:
+            self._queue.append(script)
+
+    @QtCore.pyqtSlot(str)
+    def frameReady(self, key): # called from javascript
+        self.frames[key] = True
+        self.frameLoaded.emit(key)
+
+    # move the view into a page's layout (only the visible page holds it)
+    def attach(self, layout):
+        if layout.indexOf(self.view) < 0:
+            layout.addWidget(self.view)
+
+    # show a template, loading it only the first time it is seen, returns its frame key
+    def show(self, html):
+        key = "f" + hashlib.sha1(html.encode()).hexdigest()[:16]
+        if key not in self.frames:
+            self.frames[key] = False
+            self._run_shell(f"showFrame({json.dumps(key)}, {json.dumps(html)});")
+        else:
+            self._run_shell(f"showFrame({json.dumps(key)}, null);")
+        return key
+
+    def loaded(self, key):
+        return self.frames.get(key, False)
+
+    # evaluate a script inside a frame, callback receives its result
+    def run(self, key, script, callback=None):
+        js = f"document.getElementById({json.dumps(key)}).contentWindow.eval({json.dumps(script)});"
+        if callback:
+            self.view.page().runJavaScript(js, callback)
+        else:
+            self.view.page().runJavaScript(js)
+
+_preview = None
+
+def shared_preview(): # created on first use (after the QApplication exists)
+    global _preview
+    if _preview is None:
+        _preview = PreviewSurface()
+    return _preview
@@ -1,7 +1,77 @@
+import json
+
 from pages.page import CollectionEditorPage
+from pages.assets import shiki_url
+
+def code_html(theme, langs): # shiki preview, highlighter created (pre-warmed) as soon as the page loads
+    return r"""
+        <!DOCTYPE html>
+        <html>
+            <head>
+                <meta charset="utf-8" />
+                <style>
+                    body {
+                        tab-size: 4;
+                        font-family: 'Fira Code', monospace;
+                    }
+                </style>
+            </head>
+
+            <body>
+                <div id="content"></div>
+
+                <script type="module">
+
+                    import { createHighlighter } from '%s';
+
+                    const THEME = "%s";
+
+                    let highlighter = null;
+                    let pending = null; // latest request made while shiki loads
+
+                    function highlight(code, language, theme) {
+                        const start = performance.now();
+
+                        const html = highlighter.codeToHtml(code, {
+                            lang: language,
+                            theme: theme
+                        });
+
+                        const container = document.getElementById("content");
+                        container.innerHTML = html;
+                        return performance.now() - start;
+                    }
+
+                    createHighlighter({
+                        themes: [THEME],
+                        langs: %s
+                    }).then(h => {
+                        highlighter = h;
+                        if (pending) {
+                            const args = pending;
+                            pending = null;
+                            highlight(...args);
+                        }
+                    });
+
+                    window.renderCode = function (code, language = "python", theme = THEME) {
+                        if (highlighter) return highlight(code, language, theme);
+                        pending = [code, language, theme]; // superseded requests are dropped
+                        return -1;
+                    };
+                </script>
+            </body>
+        </html>
+    """ % (
+        shiki_url(),
+        theme,
+        json.dumps(langs),
+    )
 
 class ProblemsPage(CollectionEditorPage):
 
+    TITLE = "Problems"
+
     def __init__(self, collection=None):
 
         fields = {
@@ -9,77 +79,32 @@ class ProblemsPage(CollectionEditorPage):
                 'type': 'dropdown',
                 'label': 'Language',
                 'options': ["python", "cpp"],
-                'on_change': self.render_markdown,
+                'on_change': self.schedule_render,
             },
             'submission': {
                 'type': 'textedit',
                 'label': 'Submission',
-                'on_change': self.render_markdown,
+                'on_change': self.schedule_render,
             },
         }
 
         intended_collections = ['problems']
 
-        super().__init__(collection=collection, fields=fields, intended_collections=intended_collections, theme='github-dark', title="Problems")
+        super().__init__(collection=collection, fields=fields, intended_collections=intended_collections, theme='github-dark', title=self.TITLE)
     
     def gen_html(self):
-        return r"""
-            <!DOCTYPE html>
-            <html>
-                <head>
-                    <meta charset="utf-8" />
-                    <style>
-                        body {
-                            tab-size: 4;
-                            font-family: 'Fira Code', monospace;
-                        }
-                    </style>
-                </head>
-
-                <body>
-                    <div id="content"></div>
-
-                    <script type="module">
-
-                        import { createHighlighter } from 'https://esm.sh/shiki@3.0.0'; // or esm.run
-
-                        let highlighter = null;
-
-                        async function initShiki(theme) {
-                            highlighter = await createHighlighter({
-                                themes: [theme],
-                                langs: ["python", "javascript", "cpp", "java", "html"]
-                            });
-                        }
-
-                        window.renderCode = async function (code, language = "python", theme = "%s") {
-                            if (!highlighter) await initShiki(theme);
-
-                            const html = highlighter.codeToHtml(code, {
-                                lang: language,
-                                theme: theme
-                            });
-
-                            const container = document.getElementById("content");
-                            container.innerHTML = html;
-                        };
-                    </script>
-                </body>
-            </html>
-
-        """ % (
-            self.theme,
-        )
+        return code_html(self.theme, self.fields['language']['options'])
     
-    def render_markdown(self):
+    def render_script(self):
         code_lang = self.field_widgets['language'].currentText().strip()
         code_str = self.field_widgets['submission'].toPlainText()
-        js = f"renderCode({code_str!r}, {code_lang!r}, '{self.theme}');"
-        self.web.page().runJavaScript(js)
+        return f"renderCode({code_str!r}, {code_lang!r}, '{self.theme}');"
 
 
 class USACOProblemsPage(CollectionEditorPage):
 
+    TITLE = "USACO Problems"
+
     def __init__(self, collection=None):
 
         fields = {
@@ -103,12 +128,12 @@ class USACOProblemsPage(CollectionEditorPage):
                 'type': 'dropdown',
                 'label': 'Language',
                 'options': ["python", "cpp"],
-                'on_change': self.render_markdown,
+                'on_change': self.schedule_render,
             },
             'submission': {
                 'type': 'textedit',
                 'label': 'Submission',
-                'on_change': self.render_markdown,
+                'on_change': self.schedule_render,
             },
         }
 
@@ -116,62 +141,12 @@ class USACOProblemsPage(CollectionEditorPage):
 
         intended_collections = ['problems']
 
-        super().__init__(collection=collection, fields=fields, tag=tag, intended_collections=intended_collections, theme='github-dark', title="USACO Problems")
+        super().__init__(collection=collection, fields=fields, tag=tag, intended_collections=intended_collections, theme='github-dark', title=self.TITLE)
     
     def gen_html(self):
-        return r"""
-            <!DOCTYPE html>
-            <html>
-                <head>
-                    <meta charset="utf-8" />
-                    <style>
-                        body {
-                            tab-size: 4;
-                            font-family: 'Fira Code', monospace;
-                        }
-                    </style>
-                </head>
-
-                <body>
-                    <div id="content"></div>
-
-                    <script type="module">
-
-                        import { createHighlighter } from 'https://esm.sh/shiki@3.0.0'; // or esm.run
-
-                        let highlighter = null;
-
-                        async function initShiki(theme) {
-                            highlighter = await createHighlighter({
-                                themes: [theme],
-                                langs: ["python", "javascript", "cpp", "java", "html"]
-                            });
-                        }
-
-                        window.renderCode = async function (code, language = "python", theme = "%s") {
-                            if (!highlighter) await initShiki(theme);
-
-                            const html = highlighter.codeToHtml(code, {
-                                lang: language,
-                                theme: theme
-                            });
-
-                            const container = document.getElementById("content");
-                            container.innerHTML = html;
-                        };
-                    </script>
-                </body>
-            </html>
-
-        """ % (
-            self.theme,
-        )
+        return code_html(self.theme, self.fields['language']['options'])
     
-    def render_markdown(self):
-        if not hasattr(self, "htmlLoaded") or not self.htmlLoaded:
-            return
+    def render_script(self):
         code_lang = self.field_widgets['language'].currentText().strip()
         code_str = self.field_widgets['submission'].toPlainText()
-        js = f"renderCode({code_str!r}, {code_lang!r}, '{self.theme}');"
-        self.web.page().runJavaScript(js)
-
+        return f"renderCode({code_str!r}, {code_lang!r}, '{self.theme}');"
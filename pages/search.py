@@ -0,0 +1,168 @@
+import re
+import math
+import heapq
+import bisect
+
+from pages.check import iter_documents
+
+# local inverted index over document text for the Document ID picker (no Qt, built off the UI thread)
+
+SEARCH_FIELDS = {'title': 3.0, 'body': 1.0, 'submission': 1.0} # indexed field -> weight
+ID_WEIGHT = 2.0 # document IDs are searchable too
+MAX_EXPANSION = 32 # most frequent terms a trailing prefix expands to
+MAX_SCAN = 1024 # matching terms considered for that (in sorted order), so a short prefix stays cheap
+MIN_PREFIX = 2 # shorter trailing tokens only match whole terms
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower()) if text else []
+
+class SearchIndex:
+
+    def __init__(self):
+        self.postings = {} # term -> {doc_id: weight}
+        self.terms = {} # doc_id -> indexed terms (for updates and removal)
+        self.titles = {} # doc_id -> title shown in results
+        self._vocab = [] # sorted terms for prefix lookups (None while bulk building)
+        self._ranked = {} # term -> doc IDs, highest weight first, then by ID (None while bulk building)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.terms
+
+    def add(self, doc_id, fields): # (re)index a document from its field values
+        self.remove(doc_id)
+
+        counts = {}
+        for token in tokenize(doc_id):
+            counts[token] = counts.get(token, 0) + ID_WEIGHT
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(fields.get(field) if isinstance(fields.get(field), str) else ""):
+                counts[token] = counts.get(token, 0) + weight
+
+        for term, count in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                if self._vocab is not None:
+                    bisect.insort(self._vocab, term)
+                if self._ranked is not None:
+                    self._ranked[term] = []
+            postings[doc_id] = 1 + math.log(count) # damped term frequency
+            if self._ranked is not None:
+                self._ranked[term].insert(self._position(term, doc_id), doc_id)
+
+        self.terms[doc_id] = list(counts)
+        self.titles[doc_id] = fields.get('title') or ""
+
+    def remove(self, doc_id):
+        for term in self.terms.pop(doc_id, ()):
+            postings = self.postings[term]
+            if self._ranked is not None:
+                del self._ranked[term][self._position(term, doc_id)]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+                if self._ranked is not None:
+                    del self._ranked[term]
+                if self._vocab is not None:
+                    del self._vocab[bisect.bisect_left(self._vocab, term)]
+        self.titles.pop(doc_id, None)
+
+    def _position(self, term, doc_id): # where doc_id belongs in the ranked postings (binary search)
+        postings, ranked = self.postings[term], self._ranked[term]
+        key = (-postings[doc_id], doc_id)
+        low, high = 0, len(ranked)
+        while low < high:
+            mid = (low + high) // 2
+            if (-postings[ranked[mid]], ranked[mid]) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _vocabulary(self):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        if self._ranked is None:
+            self._ranked = {term: sorted(postings, key=lambda doc_id: (-postings[doc_id], doc_id)) for term, postings in self.postings.items()}
+        return self._vocab
+
+    def _expand(self, term, prefix): # terms matched by one query token
+        if not prefix or len(term) < MIN_PREFIX:
+            return [term] if term in self.postings else []
+        vocab = self._vocabulary()
+        start = bisect.bisect_left(vocab, term)
+        end = min(bisect.bisect_left(vocab, term + "￿"), start + MAX_SCAN)
+        matches = vocab[start:end]
+        if len(matches) > MAX_EXPANSION:
+            matches = heapq.nlargest(MAX_EXPANSION, matches, key=lambda match: len(self.postings[match]))
+        return matches
+
+    def _ranked_scores(self, term, idf): # (-score, doc_id) best first
+        postings = self.postings[term]
+        for doc_id in self._ranked[term]:
+            yield -postings[doc_id] * idf, doc_id
+
+    def _sorted_access(self, terms, idfs): # best first over a token's terms, a document may repeat (first is its best)
+        return heapq.merge(*[self._ranked_scores(term, idfs[term]) for term in terms])
+
+    def search(self, query, limit=20): # [(doc_id, score)] best first, every token must match, the last one as a prefix
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        prefix = not query[-1].isspace() # still typing the last word
+        total = len(self.terms)
+
+        groups = [self._expand(token, prefix and i == len(tokens) - 1) for i, token in enumerate(tokens)]
+        if not all(groups):
+            return []
+        groups.sort(key=lambda terms: sum(len(self.postings[term]) for term in terms)) # rarest first, it runs out first
+        idfs = {term: math.log(1 + total / len(self.postings[term])) for terms in groups for term in terms}
+
+        # threshold algorithm: read each token's postings best first, score every new document in full,
+        # and stop once the limit-th best beats anything not read yet (or a token has no postings left)
+        streams = [self._sorted_access(terms, idfs) for terms in groups]
+        lookups = [[(self.postings[term], idfs[term]) for term in terms] for terms in groups]
+        bounds = [0] * len(groups) # latest score read per token
+        seen = set()
+        top = [] # min-heap of (score, doc_id)
+        while True:
+            for i, stream in enumerate(streams):
+                item = next(stream, None)
+                if item is None: # every match contains this token, so all of them were read
+                    return [(doc_id, score) for score, doc_id in sorted(top, reverse=True)]
+                bounds[i] = -item[0]
+                doc_id = item[1]
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                score = 0
+                for lookup in lookups: # a document's score for a token is its best matching term's
+                    part = 0
+                    for postings, idf in lookup:
+                        weight = postings.get(doc_id)
+                        if weight is not None and weight * idf > part:
+                            part = weight * idf
+                    if not part:
+                        break
+                    score += part
+                else:
+                    if len(top) < limit:
+                        heapq.heappush(top, (score, doc_id))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, doc_id))
+            if len(top) == limit and top[0][0] >= sum(bounds):
+                return [(doc_id, score) for score, doc_id in sorted(top, reverse=True)]
+
+def build_index(collection_name, tag=None, fields=tuple(SEARCH_FIELDS)): # index a collection from a projected listing (no widget access)
+    index = SearchIndex()
+    index._vocab = None # sorted once at the end instead of per term
+    index._ranked = None
+    for doc in iter_documents(collection_name, tag, fields=list(fields)):
+        index.add(doc['id'], doc)
+    index._vocabulary()
+    return index
@@ -0,0 +1,11 @@
+import os
+
+# where preview assets come from, shared by pages/assets.py and vendor.py (no Qt)
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vendor')
+
+KATEX_VERSION = '0.16.10'
+SHIKI_VERSION = '3.0.0'
+
+# remote fallbacks for assets that have not been vendored
+KATEX_CDN = f'https://cdn.jsdelivr.net/npm/katex@{KATEX_VERSION}/dist/'
+ESM_CDN = 'https://esm.sh/'
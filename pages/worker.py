@@ -0,0 +1,56 @@
+from PyQt5 import QtCore
+
+class WorkerSignals(QtCore.QObject): # QRunnable cannot emit signals itself
+
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(object)
+
+class Worker(QtCore.QRunnable):
+
+    _live = set() # queued or running workers, the pool does not own them
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+
+        # not deleted by the pool after run(), so tryTake() on a finished worker is safe
+        self.setAutoDelete(False)
+
+        # job
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+        # results are delivered back to the UI thread through queued signals
+        self.signals = WorkerSignals()
+        self.cancelled = False
+
+    # queue on pool, referenced until run() returns
+    def submit(self, pool):
+        Worker._live.add(self)
+        pool.start(self)
+
+    # take back from pool if it has not started (True if taken)
+    def withdraw(self, pool):
+        if pool.tryTake(self):
+            Worker._live.discard(self)
+            return True
+        return False
+
+    # stale requests still run to completion, but never report back
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self.cancelled:
+                    self.signals.failed.emit(e)
+                return
+            if not self.cancelled:
+                self.signals.finished.emit(result)
+        finally:
+            Worker._live.discard(self)
@@ -0,0 +1,136 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description='Local Restoring')
+parser.add_argument('--collection', type=str, help='collection name (defaults to the manifest entries when --path is a directory)')
+parser.add_argument('--path', type=str, help='file written by write.py (JSON array, NDJSON or sharded header), or a directory with manifest.json')
+parser.add_argument('--mode', type=str, choices=['upsert', 'create'], default='upsert', help='overwrite existing documents, or only create missing ones')
+parser.add_argument('--rate', type=int, default=500, help='maximum write operations per second')
+parser.add_argument('--attempts', type=int, default=5, help='tries per document before giving up on it')
+parser.add_argument('--raw-timestamps', action='store_true', help='keep ISO timestamp strings as strings')
+args = None # parsed options (set in main, or by callers importing this module)
+
+# data layer only (no Qt), the Firestore client is created on first request
+from pages import check
+from write import progress
+from shards import ShardReader, is_sharded
+
+ISO_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:\d{2}|Z)") # as written by TimestampEncoder
+
+def restore_timestamps(value): # ISO strings -> timezone-aware datetimes (nested values included)
+    if isinstance(value, str):
+        if ISO_TIMESTAMP.fullmatch(value):
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return value
+        return value
+    if isinstance(value, dict):
+        return {key: restore_timestamps(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [restore_timestamps(item) for item in value]
+    return value
+
+def read_documents(path, chunk_size=1 << 16): # stream documents from a JSON array, NDJSON file or sharded export
+    if is_sharded(path):
+        with ShardReader(path) as reader:
+            yield from reader
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path) as file:
+        buffer = file.read(chunk_size)
+        stripped = buffer.lstrip()
+        if not stripped.startswith("["): # NDJSON, one document per line
+            file.seek(0)
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        # JSON array, decoded one element at a time
+        buffer = stripped[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                doc, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield doc
+            buffer = buffer[end:]
+
+def restore_documents(collection, path): # import one file into collection, returns a summary entry
+
+    start = time.perf_counter()
+
+    docs = read_documents(path)
+    if not args.raw_timestamps:
+        docs = map(restore_timestamps, docs)
+    docs = progress(docs, collection)
+
+    counts = check.import_documents(collection, docs, create_only=args.mode == 'create', ops_per_second=args.rate)
+
+    seconds = time.perf_counter() - start
+    return {
+        "collection": collection,
+        "path": path,
+        **counts,
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(counts['written'] / seconds, 1) if seconds else None,
+    }
+
+def report(entry):
+    print(f"{entry['collection']}: {entry['written']} written, {entry['exists']} already existed, {entry['failed']} failed in {entry['seconds']}s ({entry['docs_per_second']} docs/s).")
+
+if __name__ == '__main__':
+
+    args = parser.parse_args()
+    check.BULK_ATTEMPTS = args.attempts
+    LOCAL_PATH = args.path
+
+    if not LOCAL_PATH or not os.path.exists(LOCAL_PATH):
+        print(f"Error: \"{LOCAL_PATH}\" is not a valid path.")
+        sys.exit(1)
+
+    if os.path.isdir(LOCAL_PATH): # export of several collections
+        try:
+            with open(os.path.join(LOCAL_PATH, "manifest.json")) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error: no readable manifest.json in \"{LOCAL_PATH}\" ({e}).")
+            sys.exit(1)
+        entries = [entry for entry in manifest["collections"] if not args.collection or entry["collection"] == args.collection]
+        jobs = [(entry["collection"], os.path.join(LOCAL_PATH, os.path.basename(entry["path"]))) for entry in entries]
+    else:
+        if not args.collection:
+            print("Error: no collection given (use --collection).")
+            sys.exit(1)
+        jobs = [(args.collection, LOCAL_PATH)]
+
+    start = time.perf_counter()
+    written = failed = 0
+    for collection, path in jobs:
+        entry = restore_documents(collection, path)
+        report(entry)
+        written += entry['written']
+        failed += entry['failed']
+
+    if len(jobs) > 1:
+        seconds = time.perf_counter() - start
+        print(f"Restored {written} documents into {len(jobs)} collections in {seconds:.3f}s ({written / seconds:.1f} docs/s).")
+
+    if failed:
+        sys.exit(1)
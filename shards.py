@@ -0,0 +1,254 @@
+import os
+import re
+import sys
+import gzip
+import json
+import mmap
+import zlib
+import struct
+import argparse
+import tempfile
+
+# sharded, compressed NDJSON exports with a random-access index
+#
+# PATH               header (JSON): compression, shard and index file names, document count
+# PATH.00000.gz ...  shards, each a run of independently compressed blocks of NDJSON lines
+# PATH.idx           index: HEADER, COUNT entries sorted by id, then the ids themselves
+
+COMPRESSIONS = { # compress, decompress, shard extension, zlib wbits for streaming
+    'gzip': (gzip.compress, gzip.decompress, 'gz', 31), # blocks are gzip members, so a shard is also a valid .gz file
+    'zlib': (zlib.compress, zlib.decompress, 'zz', 15),
+}
+
+MAGIC = b"FSIDX001"
+HEADER = struct.Struct("<8sQ") # magic, entry count
+ENTRY = struct.Struct("<QIIQIII") # id offset, id length, shard, block offset, block length, line offset, line length
+HEADER_PREFIX = b'{\n    "format": "sharded"' # start of every header, as written by json.dump(indent=4)
+
+class ShardWriter: # write() documents in id order, then close()
+
+    def __init__(self, path, compression='gzip', shard_size=64 << 20, block_size=64 << 10, dumps=json.dumps):
+        self.path = path
+        self.compression = compression
+        self.shard_size = shard_size # compressed bytes per shard
+        self.block_size = block_size # uncompressed bytes per block (the most a lookup decompresses)
+        self.dumps = dumps
+        self.compress = COMPRESSIONS[compression][0]
+        self.shards = []
+        self.documents = 0
+
+        self._shard = None
+        self._block = [] # encoded lines of the open block
+        self._block_ids = []
+        self._block_bytes = 0
+
+        # index entries are spooled to disk, ids arrive sorted from cursor pagination
+        self._entries = tempfile.TemporaryFile()
+        self._ids = tempfile.TemporaryFile()
+        self._ids_size = 0
+        self._last_id = None
+        self._sorted = True
+
+    def _shard_path(self, n):
+        return f"{self.path}.{n:05d}.{COMPRESSIONS[self.compression][2]}"
+
+    def write(self, doc):
+        line = (self.dumps(doc) + "\n").encode()
+        self._block.append(line)
+        self._block_ids.append(str(doc['id']).encode())
+        self._block_bytes += len(line)
+        if self._block_bytes >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        if self._shard is None or self._shard.tell() >= self.shard_size:
+            if self._shard is not None:
+                self._shard.close()
+            self.shards.append(os.path.basename(self._shard_path(len(self.shards))))
+            self._shard = open(self._shard_path(len(self.shards) - 1), "wb")
+
+        data = self.compress(b"".join(self._block))
+        offset = self._shard.tell()
+        self._shard.write(data)
+
+        line_offset = 0
+        for doc_id, line in zip(self._block_ids, self._block):
+            if self._last_id is not None and doc_id <= self._last_id:
+                self._sorted = False
+            self._last_id = doc_id
+            self._entries.write(ENTRY.pack(self._ids_size, len(doc_id), len(self.shards) - 1, offset, len(data), line_offset, len(line)))
+            self._ids.write(doc_id)
+            self._ids_size += len(doc_id)
+            line_offset += len(line)
+            self.documents += 1
+
+        self._block, self._block_ids, self._block_bytes = [], [], 0
+
+    def close(self, header=None): # finish the last block, the index and the header (written to PATH unless a file is given)
+        self._flush_block()
+        if self._shard is not None:
+            self._shard.close()
+
+        self._entries.seek(0)
+        self._ids.seek(0)
+        with open(f"{self.path}.idx", "wb") as index:
+            index.write(HEADER.pack(MAGIC, self.documents))
+            if self._sorted:
+                while True:
+                    chunk = self._entries.read(ENTRY.size * 4096)
+                    if not chunk:
+                        break
+                    index.write(chunk)
+            else: # e.g. merged incremental exports, sorted in memory
+                ids = self._ids.read()
+                entries = [ENTRY.unpack_from(chunk) for chunk in iter(lambda: self._entries.read(ENTRY.size), b"")]
+                entries.sort(key=lambda entry: ids[entry[0]:entry[0] + entry[1]])
+                for entry in entries:
+                    index.write(ENTRY.pack(*entry))
+            self._ids.seek(0)
+            while True:
+                chunk = self._ids.read(1 << 20)
+                if not chunk:
+                    break
+                index.write(chunk)
+        self._entries.close()
+        self._ids.close()
+
+        info = {
+            "format": "sharded",
+            "compression": self.compression,
+            "documents": self.documents,
+            "shards": self.shards,
+            "index": os.path.basename(f"{self.path}.idx"),
+        }
+        if header is None:
+            with open(self.path, "w") as file:
+                json.dump(info, file, indent=4)
+        else:
+            json.dump(info, header, indent=4)
+
+        # shards of an earlier, larger (or differently compressed) export under the same path
+        directory = os.path.dirname(self.path) or "."
+        pattern = re.compile(re.escape(os.path.basename(self.path)) + r"\.\d{5}\.(gz|zz)")
+        for name in os.listdir(directory):
+            if pattern.fullmatch(name) and name not in self.shards:
+                os.remove(os.path.join(directory, name))
+
+def is_sharded(path): # header written by ShardWriter, detected from its first bytes and the index sidecar (other exports are never parsed here)
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(HEADER_PREFIX)) != HEADER_PREFIX:
+                return False
+        with open(f"{path}.idx", "rb") as index:
+            return index.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+class ShardReader: # point lookups through the memory-mapped index, only one block is decompressed per document
+
+    def __init__(self, path):
+        with open(path) as file:
+            self.header = json.load(file)
+        directory = os.path.dirname(path)
+        self.shards = [os.path.join(directory, shard) for shard in self.header["shards"]]
+        self.decompress = COMPRESSIONS[self.header["compression"]][1]
+
+        self._file = open(os.path.join(directory, self.header["index"]), "rb")
+        self._index = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._index)
+        if magic != MAGIC:
+            raise ValueError(f"\"{path}\" has no valid index")
+        self._ids = HEADER.size + self.count * ENTRY.size # start of the id area
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._index.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._index, HEADER.size + i * ENTRY.size)
+
+    def _id(self, entry):
+        return self._index[self._ids + entry[0]:self._ids + entry[0] + entry[1]]
+
+    def _find(self, doc_id): # binary search over the sorted entries
+        key = doc_id.encode()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._id(self._entry(mid)) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count:
+            entry = self._entry(low)
+            if self._id(entry) == key:
+                return entry
+        return None
+
+    def _read_block(self, shard, offset, length):
+        with open(self.shards[shard], "rb") as file:
+            file.seek(offset)
+            return self.decompress(file.read(length))
+
+    def get(self, doc_id): # document or None
+        entry = self._find(doc_id)
+        if entry is None:
+            return None
+        _, _, shard, offset, length, line_offset, line_length = entry
+        block = self._read_block(shard, offset, length)
+        return json.loads(block[line_offset:line_offset + line_length])
+
+    def __contains__(self, doc_id):
+        return self._find(doc_id) is not None
+
+    def ids(self): # document IDs in sorted order
+        for i in range(self.count):
+            yield self._id(self._entry(i)).decode()
+
+    def __iter__(self): # every document, in file order, streamed block by block
+        wbits = COMPRESSIONS[self.header["compression"]][3]
+        for shard in self.shards:
+            with open(shard, "rb") as file:
+                stream = zlib.decompressobj(wbits)
+                pending = b""
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    while chunk:
+                        pending += stream.decompress(chunk)
+                        if stream.eof: # next block starts a new stream
+                            chunk = stream.unused_data
+                            stream = zlib.decompressobj(wbits)
+                        else:
+                            chunk = b""
+                    lines = pending.split(b"\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        if line:
+                            yield json.loads(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sharded Export Lookup')
+    parser.add_argument('path', type=str, help='header file written by write.py --format sharded')
+    parser.add_argument('id', type=str, nargs='*', help='document IDs to print (all IDs if none)')
+    args = parser.parse_args()
+
+    with ShardReader(args.path) as reader:
+        if not args.id:
+            for doc_id in reader.ids():
+                print(doc_id)
+        for doc_id in args.id:
+            doc = reader.get(doc_id)
+            if doc is None:
+                print(f"\"{doc_id}\" not found.", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(doc, indent=4))
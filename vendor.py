@@ -0,0 +1,72 @@
+import os
+import re
+import sys
+import argparse
+import urllib.request
+
+# same layout and versions as pages/assets.py, without importing Qt
+from pages.sources import VENDOR_DIR, SHIKI_VERSION, KATEX_CDN, ESM_CDN
+
+parser = argparse.ArgumentParser(description='Vendor Preview Assets')
+parser.add_argument('--langs', type=str, nargs='+', default=["python", "javascript", "cpp", "java", "html"], help='shiki languages to vendor')
+parser.add_argument('--themes', type=str, nargs='+', default=["github-dark"], help='shiki themes to vendor')
+
+MODULE_EXTENSIONS = ('.mjs', '.js', '.css', '.wasm', '.json', '.woff2', '.woff', '.ttf')
+
+# esm.sh modules reference each other with absolute paths
+IMPORT_RE = re.compile(r'''(?:\bfrom|\bimport)\s*\(?\s*["'](/[^"']+)["']''')
+DYNAMIC_RE = re.compile(r'''\bimport\s*\(\s*["'](/[^"']+)["']''')
+
+def fetch(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read()
+
+def save(path, data):
+    local = os.path.join(VENDOR_DIR, path.lstrip('/'))
+    if os.path.splitext(path)[1] not in MODULE_EXTENSIONS: # entry point without extension (e.g. /shiki@3.0.0)
+        local = os.path.join(local, 'index.mjs')
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    with open(local, 'wb') as file:
+        file.write(data)
+
+def vendor_katex():
+    css = fetch(KATEX_CDN + 'katex.min.css')
+    save('katex/katex.min.css', css)
+    save('katex/katex.min.js', fetch(KATEX_CDN + 'katex.min.js'))
+
+    # fonts referenced by the stylesheet
+    fonts = sorted(set(re.findall(r'url\((fonts/[^)]+)\)', css.decode())))
+    for font in fonts:
+        save(f'katex/{font}', fetch(KATEX_CDN + font))
+    print(f"katex: {len(fonts) + 2} files")
+
+def vendor_shiki(langs, themes):
+    wanted = set(langs) | set(themes) | {'wasm'} # dynamic chunks worth keeping
+    seen = set()
+    queue = [f'/shiki@{SHIKI_VERSION}']
+    while queue:
+        path = queue.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+
+        data = fetch(ESM_CDN + path.lstrip('/'))
+        save(path, data)
+
+        text = data.decode(errors='ignore')
+        dynamic = set(DYNAMIC_RE.findall(text))
+        for dep in IMPORT_RE.findall(text):
+            name = os.path.splitext(dep.rsplit('/', 1)[-1])[0]
+            if dep in dynamic and name not in wanted: # languages and themes that are never loaded
+                continue
+            queue.append(dep)
+    print(f"shiki: {len(seen)} files")
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    try:
+        vendor_katex()
+        vendor_shiki(args.langs, args.themes)
+    except OSError as e:
+        print(f"Error: could not fetch assets ({e}).")
+        sys.exit(1)
@@ -1,47 +1,197 @@
 import os
 import sys
 import json
+import time
 import argparse
+import textwrap
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 parser = argparse.ArgumentParser(description='Local Saving')
-parser.add_argument('--collection', type=str, help='collection name')
-parser.add_argument('--path', type=str, help='local path')
-args = parser.parse_args()
+parser.add_argument('--collection', type=str, nargs='+', help='collection name(s)')
+parser.add_argument('--all', action='store_true', help='export every collection')
+parser.add_argument('--path', type=str, help='local path (directory when exporting several collections)')
+parser.add_argument('--format', type=str, choices=['json', 'ndjson', 'sharded'], default='json', help='JSON array, newline-delimited JSON, or compressed NDJSON shards with an id index')
+parser.add_argument('--compression', type=str, choices=['gzip', 'zlib'], default='gzip', help='shard compression (sharded format)')
+parser.add_argument('--shard-size', type=int, default=64, help='compressed MB per shard (sharded format)')
+parser.add_argument('--block-size', type=int, default=64, help='KB per independently compressed block, the most a lookup decompresses (sharded format)')
+parser.add_argument('--page-size', type=int, default=500, help='documents fetched per request')
+parser.add_argument('--workers', type=int, default=4, help='collections exported concurrently')
+parser.add_argument('--incremental', action='store_true', help='only fetch documents updated since the last run')
+args = None # parsed options (set in main, or by callers importing this module)
 
-from google.cloud import firestore
-from google.oauth2 import service_account
+# data layer only (no Qt), the Firestore client is created on first request
+from pages.check import check_collection, get_collections, iter_documents, list_document_ids, load_documents_since
+from shards import ShardWriter, ShardReader, is_sharded
 
-from pages.check import check_collection, load_documents
+class TimestampEncoder(json.JSONEncoder): # Firestore timestamps -> ISO strings
 
-creds = service_account.Credentials.from_service_account_file(
-    'service_account.json'
-)
-db = firestore.Client(credentials=creds)
+    def default(self, o):
+        if hasattr(o, "isoformat"):
+            return o.isoformat()
+        return super().default(o)
 
-LOCAL_PATH = args.path
-    
-def write_documents():
+def write_json(docs, file): # incrementally written JSON array, same layout as json.dump(indent=4)
+    file.write("[")
+    empty = True
+    for doc in docs:
+        file.write("\n" if empty else ",\n")
+        file.write(textwrap.indent(json.dumps(doc, indent=4, cls=TimestampEncoder), " " * 4))
+        empty = False
+        yield doc
+    file.write("]" if empty else "\n]")
+
+def write_ndjson(docs, file): # one document per line
+    for doc in docs:
+        file.write(json.dumps(doc, cls=TimestampEncoder))
+        file.write("\n")
+        yield doc
 
-    docs = load_documents(args.collection)
+def write_sharded(docs, file): # compressed shards and index next to file, which receives the header
+    writer = ShardWriter(
+        file.name, args.compression, args.shard_size << 20, args.block_size << 10,
+        dumps=lambda doc: json.dumps(doc, cls=TimestampEncoder),
+    )
+    for doc in docs:
+        writer.write(doc)
+        yield doc
+    writer.close(file)
+
+WRITERS = {
+    'json': write_json,
+    'ndjson': write_ndjson,
+    'sharded': write_sharded,
+}
 
-    if docs is None:
-        print(f"\"{args.collection}\" collection does not exist.")
-        return
+def progress(docs, label, every=100, inline=True): # document counter on stderr
+    count = 0
+    for doc in docs:
+        count += 1
+        if count % every == 0:
+            print(f"\r{label}: {count} documents" if inline else f"{label}: {count} documents", end="" if inline else "\n", file=sys.stderr, flush=True)
+        yield doc
+    print(f"\r{label}: {count} documents" if inline else f"{label}: {count} documents", file=sys.stderr, flush=True)
     
+STATE_OVERLAP = 60 # seconds before an export's start that the next incremental run reads again (clock skew against server timestamps)
+
+def track_updated(docs, seen): # note whether any document streamed through carries an 'updated' timestamp
     for doc in docs:
-        for field in doc:
-            if hasattr(doc[field], "isoformat"):
-                doc[field] = doc[field].isoformat()
+        if isinstance(doc.get('updated'), datetime):
+            seen[0] = True
+        yield doc
+
+def state_path(path): # high-water mark file next to the export
+    return f"{path}.state.json"
+
+def read_state(path):
+    try:
+        with open(state_path(path)) as file:
+            return datetime.fromisoformat(json.load(file)["updated"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_state(path, mark):
+    with open(state_path(path), "w") as file:
+        json.dump({"updated": mark.isoformat()}, file)
+
+def read_local(path): # documents from an earlier export (JSON array, NDJSON or sharded)
+    if is_sharded(path):
+        with ShardReader(path) as reader:
+            return list(reader)
+    with open(path) as file:
+        text = file.read()
+    if not text.strip():
+        return []
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def write_documents(collection, path, inline=True): # export one collection, returns its manifest entry
+
+    start = time.perf_counter()
+    entry = {"collection": collection, "path": path}
+
+    # the mark is when this export started, not the latest 'updated' seen: pages are separate reads,
+    # so a document on an earlier page can be updated before a later page is read
+    mark = datetime.now(timezone.utc) - timedelta(seconds=STATE_OVERLAP)
+    since = read_state(path) if args.incremental else None
+    seen = [since is not None]
+
+    if since is None: # full export
+        # cursor-paginated reads, so only one page is held in memory at a time
+        docs = iter_documents(collection, fields=None, page_size=args.page_size)
+        entry["mode"] = "full"
+    else: # merge documents updated since last run into the local file
+        existing = {doc['id']: doc for doc in read_local(path)}
+        changed = load_documents_since(collection, since)
+        for doc in changed:
+            existing[doc['id']] = doc
 
-    with open(LOCAL_PATH, "w") as file:
-        json.dump(docs, file, indent=4)
+        # deletions are found with an ID-only listing
+        ids = set(list_document_ids(collection))
+        docs = [doc for doc_id, doc in existing.items() if doc_id in ids]
+
+        entry["mode"] = "incremental"
+        entry["changed"] = len(changed)
+        entry["deleted"] = len(existing) - len(docs)
+
+    docs = track_updated(docs, seen)
+
+    count = 0
+    with open(path, "w") as file:
+        for _ in progress(WRITERS[args.format](docs, file), collection, every=100 if inline else 1000, inline=inline):
+            count += 1
+
+    if args.incremental and seen[0]: # without 'updated' timestamps every run stays a full export
+        write_state(path, mark)
+
+    entry["documents"] = count
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+def write_collections(collections, directory): # export collections concurrently, sharing one client
+
+    start = time.perf_counter()
+
+    paths = [os.path.join(directory, f"{collection}.{args.format}") for collection in collections]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        entries = list(executor.map(lambda c, p: write_documents(c, p, inline=False), collections, paths))
+
+    manifest = {
+        "format": args.format,
+        "documents": sum(entry["documents"] for entry in entries),
+        "seconds": round(time.perf_counter() - start, 3),
+        "collections": entries,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=4)
+
+    return manifest
 
 if __name__ == '__main__':
-    if not check_collection(args.collection):
-        print(f"\"{args.collection}\" collection does not exist.")
-        sys.exit(1)
-    if not os.path.exists(LOCAL_PATH) or os.path.isdir(LOCAL_PATH):
-        print(f"Error: \"{LOCAL_PATH}\" is not a valid file path.")
+
+    args = parser.parse_args()
+    LOCAL_PATH = args.path
+
+    collections = get_collections() if args.all else (args.collection or [])
+
+    if not collections:
+        print("Error: no collection given (use --collection or --all).")
         sys.exit(1)
-    write_documents()
 
+    for collection in collections:
+        if not check_collection(collection):
+            print(f"\"{collection}\" collection does not exist.")
+            sys.exit(1)
+
+    if len(collections) == 1 and not args.all: # single collection, single file
+        if not os.path.exists(LOCAL_PATH) or os.path.isdir(LOCAL_PATH):
+            print(f"Error: \"{LOCAL_PATH}\" is not a valid file path.")
+            sys.exit(1)
+        write_documents(collections[0], LOCAL_PATH)
+    else: # one file per collection plus manifest
+        if not os.path.isdir(LOCAL_PATH):
+            print(f"Error: \"{LOCAL_PATH}\" is not a valid directory.")
+            sys.exit(1)
+        manifest = write_collections(collections, LOCAL_PATH)
+        print(f"Exported {manifest['documents']} documents from {len(collections)} collections in {manifest['seconds']}s.")